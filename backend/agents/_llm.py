@@ -0,0 +1,83 @@
+"""
+Shared Gemini helpers for the agents package.
+
+- One configured ``GenerativeModel`` reused by every agent, created on the
+  first LLM call rather than at import time
+- Responses memoised in a process-wide TTL cache so that identical patient
+  profiles do not re-issue identical prompts to the Gemini API
+"""
+import functools
+import hashlib
+import threading
+from cachetools import TTLCache
+from backend.config import GEMINI_API_KEY
+
+LLM_CACHE_MAXSIZE = 1024
+LLM_CACHE_TTL_SECONDS = 3600
+
+# Generation config for prompts whose reply is parsed as JSON; Gemini then
+# returns bare JSON instead of prose or markdown fences around it
+JSON_RESPONSE_CONFIG = {"response_mime_type": "application/json"}
+
+_cache: TTLCache = TTLCache(maxsize=LLM_CACHE_MAXSIZE, ttl=LLM_CACHE_TTL_SECONDS)
+_cache_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1)
+def get_model():
+    """
+    Configure the Gemini SDK and return the shared gemini-1.5-flash model.
+
+    Raises RuntimeError without building a client when GEMINI_API_KEY is
+    unset, so keyless environments (tests, local dev) go straight to each
+    agent's fallback instead of attempting an unauthenticated API call.
+    """
+    if not GEMINI_API_KEY:
+        raise RuntimeError("GEMINI_API_KEY is not set")
+    import google.generativeai as genai
+    genai.configure(api_key=GEMINI_API_KEY)
+    return genai.GenerativeModel("gemini-1.5-flash")
+
+
+def make_cache_key(namespace: str, *parts) -> str:
+    """
+    Build a cache key from the prompt inputs.
+
+    Each part is stripped, lowercased and whitespace-collapsed so trivial
+    formatting variants of the same profile share one cache entry.
+    """
+    canonical = "\x1f".join(" ".join(str(p).split()).lower() for p in parts)
+    return hashlib.sha1(f"{namespace}\x1e{canonical}".encode("utf-8")).hexdigest()
+
+
+def cached_generate(model, prompt: str, key: str, parse=None, generation_config=None):
+    """
+    Return the Gemini response for ``prompt``, served from cache when possible.
+
+    If ``parse`` is given it is applied to the response text and the parsed
+    value is cached instead. ``generation_config`` (e.g. JSON_RESPONSE_CONFIG)
+    is passed through to the model. Errors from the model or the parser are
+    propagated to the caller and never cached, so callers keep their own
+    fallback behaviour.
+    """
+    with _cache_lock:
+        value = _cache.get(key)
+    if value is not None:
+        return value
+
+    if generation_config is None:
+        response = model.generate_content(prompt)
+    else:
+        response = model.generate_content(prompt, generation_config=generation_config)
+    value = response.text.strip()
+    if parse is not None:
+        value = parse(value)
+    with _cache_lock:
+        _cache[key] = value
+    return value
+
+
+def clear_cache() -> None:
+    """Drop all memoised Gemini responses."""
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,60 @@
+"""
+Process-wide sub-agent instances.
+
+The sub-agents hold no per-session state, so every PlannerAgent (one per
+API session) shares a single instance of each. Expensive set-up such as
+loading the knowledge files and building the DecisionEngine indexes then
+happens once per process instead of once per request.
+
+Each sub-agent module is imported inside its factory, so importing the
+planner does not pull in SQLAlchemy, ChromaDB or the Gemini SDK until a
+step actually needs them.
+"""
+from __future__ import annotations
+
+from functools import cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from backend.agents.question_service import QuestionService
+    from backend.agents.medical_data_service import MedicalDataService
+    from backend.agents.validation_engine import ValidationEngine
+    from backend.agents.decision_engine import DecisionEngine
+    from backend.agents.recommendation_engine import RecommendationEngine
+    from backend.agents.explanation_engine import ExplanationEngine
+
+
+@cache
+def get_question_service() -> QuestionService:
+    from backend.agents.question_service import QuestionService
+    return QuestionService()
+
+
+@cache
+def get_medical_data_service() -> MedicalDataService:
+    from backend.agents.medical_data_service import MedicalDataService
+    return MedicalDataService()
+
+
+@cache
+def get_validation_engine() -> ValidationEngine:
+    from backend.agents.validation_engine import ValidationEngine
+    return ValidationEngine()
+
+
+@cache
+def get_decision_engine() -> DecisionEngine:
+    from backend.agents.decision_engine import DecisionEngine
+    return DecisionEngine()
+
+
+@cache
+def get_recommendation_engine() -> RecommendationEngine:
+    from backend.agents.recommendation_engine import RecommendationEngine
+    return RecommendationEngine()
+
+
+@cache
+def get_explanation_engine() -> ExplanationEngine:
+    from backend.agents.explanation_engine import ExplanationEngine
+    return ExplanationEngine()
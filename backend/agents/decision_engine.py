@@ -8,15 +8,32 @@ Responsibilities:
 - Use Gemini LLM for nuanced reasoning
 - Return structured decision dict
 """
+import asyncio
+import copy
+import functools
+import hashlib
+import heapq
 import json
+import logging
 import os
 import re
-import google.generativeai as genai
-from backend.config import GEMINI_API_KEY
-from backend.chroma.chroma_setup import query_disease_guidelines, query_hospital_summaries
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+from typing import Any, Callable
+from cachetools import TTLCache
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+from backend.config import SURGICAL_KEYWORDS, LLM_BYPASS_ENABLED
+from backend.agents._llm import (
+    get_model, make_cache_key, cached_generate, clear_cache, JSON_RESPONSE_CONFIG,
+)
+from backend.agents.explanation_engine import default_explanation
+from backend.agents._registry import get_decision_engine, get_explanation_engine
 
-genai.configure(api_key=GEMINI_API_KEY)
-_model = genai.GenerativeModel("gemini-1.5-flash")
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
 
 # Load disease guidelines from JSON for deterministic rule-based filtering
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -24,12 +41,142 @@ KNOWLEDGE_DIR = os.path.join(BASE_DIR, "..", "knowledge")
 DISEASE_FILE = os.path.join(KNOWLEDGE_DIR, "disease_guidelines.json")
 HOSPITAL_FILE = os.path.join(KNOWLEDGE_DIR, "hospital_data.json")
 
+# Background pool so ChromaDB retrieval overlaps with the JSON rule evaluation
+_IO_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="decision-io")
+
+# Budget categories allowed per budget tier / hospital preference
+_ALL_BUDGETS = frozenset({"Government", "Standard", "Premium"})
+_LOW_BUDGETS = frozenset({"Government", "Standard"})
+_GOVERNMENT_BUDGETS = frozenset({"Government"})
+_PRIVATE_BUDGETS = frozenset({"Standard", "Premium"})
+
+# Full decisions memoised per profile fingerprint (see ``_fingerprint``)
+PIPELINE_CACHE_MAXSIZE = 4096
+PIPELINE_CACHE_TTL_SECONDS = 24 * 3600
+_PIPELINE_CACHE: TTLCache = TTLCache(maxsize=PIPELINE_CACHE_MAXSIZE, ttl=PIPELINE_CACHE_TTL_SECONDS)
+_pipeline_lock = threading.Lock()
+
+# Profile fields that influence the decision; anything else is ignored when
+# fingerprinting so that e.g. free-text symptoms do not split cache entries
+CANONICAL_FIELDS = ("disease_type", "stage", "surgery_allowed", "age", "gender", "medical_history")
+
+# medical_history values that carry no clinical information
+_TRIVIAL_HISTORY = frozenset({"", "none", "none stated", "nil", "no", "na", "n/a", "-", "not applicable"})
+
+# Reasoning used instead of Gemini for routine, guideline-covered profiles
+_REASONING_TEMPLATE = (
+    "The patient has {stage} {disease} with no significant prior medical history. "
+    "Established clinical guidelines for this stage recommend {treatment}, "
+    "coordinated by a {specialist}. Following the guideline timeline ({timeline}) "
+    "gives the best expected outcome."
+)
+
+# Gemini prompt for the combined clinical reasoning + patient explanation
+_REASONING_PROMPT = """
+You are a senior medical decision support assistant. Given the following patient profile and recommended treatment, write two texts:
+
+1. "reasoning": a brief clinical reasoning (3-4 sentences) explaining why this treatment is appropriate.
+2. "explanation": a clear, empathetic 3-5 sentence explanation for the patient about what treatment is recommended and why, what they can expect in terms of timeline, and the importance of visiting a specialist. Use simple language and write it as a single paragraph.
+
+Patient Profile:
+- Disease: {disease}
+- Stage: {stage}
+- Age: {age}
+- Gender: {gender}
+- Medical History: {medical_history}
+- Surgery Allowed: {surgery_allowed}
+
+Recommended Treatment: {treatment_type}
+Timeline: {timeline}
+Specialist: {specialist}
+Guidelines Context: {guideline_context}
+Notes: {notes}
+
+Do not use markdown or headers inside the texts.
+Respond ONLY with JSON: {{"reasoning": "...", "explanation": "..."}}
+"""
+
+# Strips ```json ... ``` fences Gemini sometimes wraps JSON answers in
+_JSON_FENCE_RE = re.compile(r"^```(?:json)?|```$", re.M)
+
+# Matches surgical treatments that must be dropped when surgery is not allowed.
+# Plain substring alternation (no word boundaries), so "surgeries",
+# "neurosurgery" and "microsurgical" are caught like the compliance check does
+_SURGERY_RE = re.compile(
+    "|".join(re.escape(k) for k in SURGICAL_KEYWORDS),
+    re.IGNORECASE,
+)
+
 
 def _load_json(path: str) -> dict:
+    """
+    Load a knowledge file, reusing the parsed copy until the file changes.
+
+    DecisionEngine rebuilds its indexes when this returns a new document.
+    Decisions already in the pipeline cache are not re-derived; call
+    ``invalidate()`` to drop them along with everything else.
+    """
+    return _load_json_cached(path, os.path.getmtime(path))
+
+
+@functools.lru_cache(maxsize=4)
+def _load_json_cached(path: str, mtime: float) -> dict:
+    if orjson is not None:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
     with open(path, "r") as f:
         return json.load(f)
 
 
+@functools.lru_cache(maxsize=512)
+def _cached_guideline_docs(query: str, n_results: int) -> tuple[str, ...]:
+    """
+    ChromaDB guideline search memoised per normalised query text.
+    Call ``_cached_guideline_docs.cache_clear()`` after re-seeding ChromaDB.
+    """
+    from backend.chroma.chroma_setup import query_disease_guidelines
+    return tuple(
+        r["document"] for r in query_disease_guidelines(query, n_results=n_results)
+    )
+
+
+def _fingerprint(profile: dict, constraint: dict) -> bytes:
+    """Canonical hash of everything ``DecisionEngine.analyze`` depends on."""
+    canonical = {k: profile.get(k) for k in CANONICAL_FIELDS} | {"c": constraint}
+    payload = json.dumps(canonical, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+def invalidate() -> None:
+    """
+    Flush every decision-level cache. Call after updating the knowledge
+    files or re-seeding ChromaDB.
+
+    The shared DecisionEngine / ExplanationEngine instances are dropped as
+    well, so their catalogue indexes and per-hospital memos are rebuilt from
+    the edited files on next use.
+    """
+    with _pipeline_lock:
+        _PIPELINE_CACHE.clear()
+    _load_json_cached.cache_clear()
+    _cached_guideline_docs.cache_clear()
+    clear_cache()
+    get_decision_engine.cache_clear()
+    get_explanation_engine.cache_clear()
+    # Completed plans embed decisions, so they go too (lazy: planner imports us)
+    from backend.agents.planner_agent import clear_response_cache
+    clear_response_cache()
+
+
+def _parse_llm_json(text: str) -> dict:
+    """Parse the combined reasoning/explanation JSON returned by Gemini."""
+    data = json.loads(_JSON_FENCE_RE.sub("", text).strip())
+    return {
+        "reasoning": str(data["reasoning"]).strip(),
+        "explanation": str(data["explanation"]).strip(),
+    }
+
+
 class DecisionEngine:
     """
     Applies decision logic to select treatment type and hospital type,
@@ -37,80 +184,156 @@ class DecisionEngine:
     """
 
     def __init__(self):
-        self._disease_data = _load_json(DISEASE_FILE)
-        self._hospital_data = _load_json(HOSPITAL_FILE)
+        # Knowledge files and the indexes below are loaded on first use, so
+        # constructing a DecisionEngine costs nothing until analyze() runs.
+        # name -> (source document, index); see ``_indexed``.
+        self._indexes: dict[str, tuple[dict, Any]] = {}
+
+    def _indexed(self, name: str, doc: dict, build: Callable[[dict], Any]) -> Any:
+        """
+        Return the ``name`` index built from ``doc``.
+
+        ``_load_json`` hands back a new document once a knowledge file's
+        mtime changes, so an index whose source is no longer ``doc`` is
+        rebuilt instead of serving the previous catalogue.
+        """
+        entry = self._indexes.get(name)
+        if entry is None or entry[0] is not doc:
+            entry = self._indexes[name] = (doc, build(doc))
+        return entry[1]
+
+    @property
+    def _disease_data(self) -> dict:
+        return _load_json(DISEASE_FILE)
+
+    @property
+    def _hospital_data(self) -> dict:
+        return _load_json(HOSPITAL_FILE)
+
+    @property
+    def _rating_by_id(self) -> dict[str, float]:
+        # Numeric ratings parsed once, kept beside the catalogue so the shared
+        # hospital dicts (which end up in decisions and API output) stay clean
+        return self._indexed("rating_by_id", self._hospital_data, lambda doc: {
+            h["hospital_id"]: float(h.get("rating", 0)) for h in doc["hospitals"]
+        })
+
+    @property
+    def _disease_index(self) -> list[tuple[str, dict, list[tuple[str, dict]]]]:
+        # Lowercased lookup keys computed once instead of on every analyze()
+        # [(disease_type_lower, disease, [(stage_lower, stage_info), ...]), ...]
+        return self._indexed("disease_index", self._disease_data, lambda doc: [
+            (d["disease_type"].lower(), d, [(s["stage"].lower(), s) for s in d["stages"]])
+            for d in doc["diseases"]
+        ])
+
+    @property
+    def _stage_by_exact(self) -> dict[tuple[str, str], tuple[dict, dict]]:
+        # Exact (disease_type, stage) hash lookup tried before the substring scan
+        return self._indexed("stage_by_exact", self._disease_data, lambda doc: {
+            (name_lower, s_lower): (d, s)
+            for name_lower, d, stages in self._disease_index
+            for s_lower, s in stages
+        })
+
+    @property
+    def _multi_specialty(self) -> list[dict]:
+        return self._indexed("multi_specialty", self._hospital_data, lambda doc: [
+            h for h in doc["hospitals"] if h["type"] == "Multi-specialty"
+        ])
+
+    @property
+    def _candidates_by_type(self) -> dict[str, list[dict]]:
+        # Candidate hospitals per requested type (that type + Multi-specialty),
+        # kept in catalogue order so the per-request scan skips other types.
+        def build(doc: dict) -> dict[str, list[dict]]:
+            hospitals = doc["hospitals"]
+            return {
+                t: [h for h in hospitals if h["type"] == t or h["type"] == "Multi-specialty"]
+                for t in {h["type"] for h in hospitals}
+            }
+        return self._indexed("candidates_by_type", self._hospital_data, build)
+
+    @property
+    def _filter_cache(self) -> dict[tuple[str, frozenset], tuple[dict, ...]]:
+        # (hospital_type, allowed_budgets) -> top-5 hospitals; bounded by the
+        # small number of type x budget-tier combinations, reset with the catalogue.
+        return self._indexed("filter_cache", self._hospital_data, lambda doc: {})
+
+    @staticmethod
+    def _guideline(disease: dict, stage_info: dict) -> dict:
+        return {
+            "disease_type": disease["disease_type"],
+            "hospital_type": disease["hospital_type"],
+            "specialist": disease["specialist"],
+            "stage_info": stage_info,
+        }
 
     def _find_disease_guideline(self, disease_type: str, stage: str) -> dict | None:
         """Find the best matching disease guideline from JSON."""
         disease_type_lower = disease_type.lower()
-        for disease in self._disease_data["diseases"]:
-            if disease["disease_type"].lower() in disease_type_lower or \
-               disease_type_lower in disease["disease_type"].lower():
+        stage_lower = stage.lower()
+        exact = self._stage_by_exact.get((disease_type_lower.strip(), stage_lower.strip()))
+        if exact:
+            return self._guideline(*exact)
+
+        for name_lower, disease, stages in self._disease_index:
+            if name_lower in disease_type_lower or disease_type_lower in name_lower:
                 # Find matching stage
-                for s in disease["stages"]:
-                    if s["stage"].lower() in stage.lower() or stage.lower() in s["stage"].lower():
-                        return {
-                            "disease_type": disease["disease_type"],
-                            "hospital_type": disease["hospital_type"],
-                            "specialist": disease["specialist"],
-                            "stage_info": s,
-                        }
+                for s_lower, s in stages:
+                    if s_lower in stage_lower or stage_lower in s_lower:
+                        return self._guideline(disease, s)
                 # Return first stage if no exact match
-                if disease["stages"]:
-                    return {
-                        "disease_type": disease["disease_type"],
-                        "hospital_type": disease["hospital_type"],
-                        "specialist": disease["specialist"],
-                        "stage_info": disease["stages"][0],
-                    }
+                if stages:
+                    return self._guideline(disease, stages[0][1])
         return None
 
-    def _filter_hospitals(self, hospital_type: str, constraint: dict,
-                          location_preference: str = None) -> list[dict]:
-        """Filter hospitals from JSON based on type, budget, and location."""
+    @staticmethod
+    def _allowed_budgets(constraint: dict) -> frozenset:
+        """Map budget limit and hospital preference to allowed budget categories."""
         budget_limit = constraint.get("budget_limit")
-        location_type = constraint.get("location_type", "national")
         hospital_pref = constraint.get("hospital_preference", "any")
 
+        # Hospital preference filter
+        if hospital_pref == "government":
+            return _GOVERNMENT_BUDGETS
+        if hospital_pref == "private":
+            return _PRIVATE_BUDGETS
+
         # Determine budget category filter
         if budget_limit is not None:
             try:
-                budget = float(budget_limit)
-                if budget < 100000:
-                    allowed_budgets = {"Government", "Standard"}
-                elif budget < 500000:
-                    allowed_budgets = {"Government", "Standard", "Premium"}
-                else:
-                    allowed_budgets = {"Government", "Standard", "Premium"}
+                if float(budget_limit) < 100000:
+                    return _LOW_BUDGETS
             except (ValueError, TypeError):
-                allowed_budgets = {"Government", "Standard", "Premium"}
-        else:
-            allowed_budgets = {"Government", "Standard", "Premium"}
+                pass
+        return _ALL_BUDGETS
 
-        # Hospital preference filter
-        if hospital_pref == "government":
-            allowed_budgets = {"Government"}
-        elif hospital_pref == "private":
-            allowed_budgets = {"Standard", "Premium"}
-
-        filtered = []
-        for h in self._hospital_data["hospitals"]:
-            # Type match (exact or multi-specialty)
-            if h["type"] != hospital_type and h["type"] != "Multi-specialty":
-                continue
+    def _filter_hospitals(self, hospital_type: str, constraint: dict,
+                          location_preference: str = None) -> list[dict]:
+        """
+        Filter hospitals from JSON based on type and budget.
+
+        The location preference is accepted for API compatibility but does not
+        exclude hospitals, so results are memoised per (hospital_type,
+        allowed budget categories) signature.
+        """
+        allowed_budgets = self._allowed_budgets(constraint)
+        key = (hospital_type, allowed_budgets)
+        filter_cache = self._filter_cache
+        cached = filter_cache.get(key)
+        if cached is None:
+            # Type match (exact or multi-specialty) is resolved by the candidate index
+            candidates = self._candidates_by_type.get(hospital_type, self._multi_specialty)
             # Budget match
-            if h["budget_category"] not in allowed_budgets:
-                continue
-            # Location preference
-            if location_preference:
-                loc_lower = location_preference.lower()
-                if loc_lower and loc_lower not in h["city"].lower() and loc_lower not in h["location"].lower():
-                    pass  # Don't exclude, just de-prioritize later
-            filtered.append(h)
-
-        # Sort by rating descending
-        filtered.sort(key=lambda x: x.get("rating", 0), reverse=True)
-        return filtered[:5]  # Return top 5
+            filtered = (h for h in candidates if h["budget_category"] in allowed_budgets)
+
+            # Top 5 by rating descending (same order as a stable full sort)
+            ratings = self._rating_by_id
+            cached = tuple(heapq.nlargest(5, filtered, key=lambda x: ratings[x["hospital_id"]]))
+            filter_cache[key] = cached
+        # Fresh dicts, so edits to a decision never reach the shared catalogue
+        return [dict(h) for h in cached]
 
     def analyze(self, profile: dict, constraint: dict) -> dict:
         """
@@ -122,7 +345,8 @@ class DecisionEngine:
 
         Returns:
             Dict with treatment_type, hospital_type, suggested_hospitals, timeline,
-            required_reports, specialist, guideline_source, llm_reasoning
+            required_reports, specialist, guideline_source, llm_reasoning,
+            llm_explanation, degraded
         """
         disease_type = profile.get("disease_type", "Unknown")
         stage = profile.get("stage", "")
@@ -131,10 +355,26 @@ class DecisionEngine:
         medical_history = profile.get("medical_history", "")
         symptoms = profile.get("symptoms", "")
 
-        print(f"[DecisionEngine] Analyzing: disease={disease_type}, stage={stage}")
+        key = _fingerprint(profile, constraint)
+        with _pipeline_lock:
+            cached = _PIPELINE_CACHE.get(key)
+        if cached is not None:
+            logger.debug("Cache hit: disease=%s stage=%s", disease_type, stage)
+            # Callers edit the returned decision (notes, hospital lists), so hand
+            # out a deep copy; nested lists/dicts must not alias the cache entry
+            return copy.deepcopy(cached)
+
+        logger.debug("Analyzing: disease=%s stage=%s", disease_type, stage)
 
         # ── Step 1: Retrieve from JSON knowledge ─────────────────────────────
         guideline = self._find_disease_guideline(disease_type, stage)
+
+        # ChromaDB context only feeds Gemini: when the LLM is needed, start the
+        # search now and collect it once the rules and hospital filter are done.
+        needs_llm = not LLM_BYPASS_ENABLED or self._needs_llm(profile, guideline)
+        if needs_llm:
+            chroma_query = " ".join(f"{disease_type} {stage} treatment".split()).lower()
+            chroma_future = _IO_POOL.submit(_cached_guideline_docs, chroma_query, 2)
         if guideline:
             stage_info = guideline["stage_info"]
             hospital_type = guideline["hospital_type"]
@@ -142,16 +382,13 @@ class DecisionEngine:
             treatments = stage_info["recommended_treatments"]
             # Filter out surgical treatments if surgery not allowed
             if not surgery_allowed:
-                treatments = [t for t in treatments if "surgery" not in t.lower()
-                              and "surgical" not in t.lower()
-                              and "lumpectomy" not in t.lower()
-                              and "mastectomy" not in t.lower()
-                              and "cabg" not in t.lower()]
+                treatments = [t for t in treatments if not _SURGERY_RE.search(t)]
             treatment_type = ", ".join(treatments[:3]) if treatments else "Medical Management"
             timeline = stage_info.get("timeline", "To be determined")
             required_reports = stage_info.get("required_reports", [])
             notes = stage_info.get("notes", "")
-            guideline_source = "JSON + ChromaDB"
+            # ChromaDB is only consulted on the LLM path
+            guideline_source = "JSON + ChromaDB" if needs_llm else "JSON"
         else:
             hospital_type = "Multi-specialty"
             specialist = "General Physician"
@@ -161,29 +398,34 @@ class DecisionEngine:
             notes = "Specific guidelines not found; general management recommended."
             guideline_source = "Default"
 
-        # ── Step 2: ChromaDB semantic search for additional context ──────────
-        try:
-            chroma_results = query_disease_guidelines(
-                f"{disease_type} {stage} treatment", n_results=2
-            )
-            chroma_context = " | ".join(
-                [r["document"][:200] for r in chroma_results]
-            )
-        except Exception as e:
-            print(f"[DecisionEngine] ChromaDB query failed: {e}")
-            chroma_context = ""
-
-        # ── Step 3: Filter hospitals ─────────────────────────────────────────
+        # ── Step 2: Filter hospitals ─────────────────────────────────────────
         location_pref = profile.get("location", constraint.get("location_type", ""))
         suggested_hospitals = self._filter_hospitals(hospital_type, constraint, location_pref)
 
-        # ── Step 4: Gemini LLM reasoning ────────────────────────────────────
-        llm_reasoning = self._gemini_reason(
-            profile=profile,
-            treatment_type=treatment_type,
-            guideline_context=chroma_context,
-            notes=notes
-        )
+        if needs_llm:
+            # ── Step 3: ChromaDB semantic search for additional context ──────
+            try:
+                chroma_docs = chroma_future.result()
+                chroma_context = " | ".join(doc[:200] for doc in chroma_docs)
+                cacheable = True
+            except Exception as e:
+                logger.warning("ChromaDB query failed: %s", e)
+                chroma_context = ""
+                cacheable = False
+
+            # ── Step 4: Gemini LLM reasoning + patient explanation (one call) ─
+            llm_output = self.reason_and_explain(
+                profile=profile,
+                treatment_type=treatment_type,
+                timeline=timeline,
+                specialist=specialist,
+                guideline_context=chroma_context,
+                notes=notes
+            )
+        else:
+            logger.debug("Routine profile: using templated reasoning")
+            llm_output = self._template_reasoning(profile, treatment_type, timeline, specialist)
+            cacheable = True
 
         decision = {
             "disease_type": disease_type,
@@ -196,42 +438,150 @@ class DecisionEngine:
             "notes": notes,
             "suggested_hospitals": suggested_hospitals,
             "guideline_source": guideline_source,
-            "llm_reasoning": llm_reasoning,
+            "llm_reasoning": llm_output["reasoning"],
+            "llm_explanation": llm_output["explanation"],
             "surgery_allowed": surgery_allowed,
+            # ChromaDB or Gemini was down; callers must not cache this result
+            "degraded": not cacheable or bool(llm_output.get("fallback")),
         }
 
-        print(f"[DecisionEngine] Decision: {treatment_type} at {hospital_type}")
+        # Degraded results are not pinned for a day
+        if not decision["degraded"]:
+            with _pipeline_lock:
+                _PIPELINE_CACHE[key] = copy.deepcopy(decision)
+
+        logger.info("Decision: %s at %s", treatment_type, hospital_type)
         return decision
 
-    def _gemini_reason(self, profile: dict, treatment_type: str,
-                       guideline_context: str, notes: str) -> str:
-        """Use Gemini to generate nuanced clinical reasoning."""
+    def prefetch_for_goal(self, goal: str) -> Future:
+        """
+        Warm the knowledge indexes and ChromaDB in the background.
+
+        Called once the execution plan exists, so the JSON load and the
+        embedding-model / ChromaDB start-up overlap with the user answering
+        questions instead of landing on the first ``analyze`` call. ``goal``
+        is accepted for API compatibility; no guideline query is issued, as
+        its result would never match the per-stage query ``analyze`` makes.
+        """
+        return _IO_POOL.submit(self._prefetch)
+
+    def _prefetch(self) -> None:
         try:
-            prompt = f"""
-You are a senior medical decision support assistant. Given the following patient profile and recommended treatment, provide a brief clinical reasoning (3-4 sentences) explaining why this treatment is appropriate.
+            self._stage_by_exact
+            self._candidates_by_type
+            from backend.chroma.chroma_setup import get_chroma_client, get_embedding_function
+            get_chroma_client()
+            get_embedding_function()
+        except Exception as e:
+            logger.debug("Prefetch failed: %s", e)
 
-Patient Profile:
-- Disease: {profile.get('disease_type', 'Unknown')}
-- Stage: {profile.get('stage', 'Unknown')}
-- Age: {profile.get('age', 'Unknown')}
-- Gender: {profile.get('gender', 'Unknown')}
-- Medical History: {profile.get('medical_history', 'None stated')}
-- Surgery Allowed: {profile.get('surgery_allowed', True)}
+    async def aanalyze(self, profile: dict, constraint: dict) -> dict:
+        """
+        Async variant of ``analyze`` for coroutine callers.
 
-Recommended Treatment: {treatment_type}
-Guidelines Context: {guideline_context[:300] if guideline_context else 'Standard guidelines'}
-Notes: {notes}
+        The ChromaDB query and Gemini call block, so the analysis runs in a
+        worker thread and the event loop keeps serving other requests.
+        """
+        return await asyncio.to_thread(self.analyze, profile, constraint)
 
-Provide ONLY the clinical reasoning paragraph, no headers or markdown.
-"""
-            response = _model.generate_content(prompt)
-            reasoning = response.text.strip()
-            print("[DecisionEngine] Gemini reasoning generated.")
-            return reasoning
+    @staticmethod
+    def _needs_llm(profile: dict, guideline: dict | None) -> bool:
+        """
+        Decide whether a profile is ambiguous enough to warrant a Gemini call.
+
+        Returns True when no guideline matched, when the patient has a
+        non-trivial medical history, or when declining surgery conflicts with
+        a guideline that recommends it.
+        """
+        if not guideline:
+            return True
+        history = " ".join(str(profile.get("medical_history") or "").split()).lower()
+        if history not in _TRIVIAL_HISTORY:
+            return True
+        if not profile.get("surgery_allowed", True):
+            treatments = guideline["stage_info"].get("recommended_treatments", [])
+            if any(_SURGERY_RE.search(t) for t in treatments):
+                return True
+        return False
+
+    @staticmethod
+    def _template_reasoning(profile: dict, treatment_type: str, timeline: str,
+                            specialist: str) -> dict:
+        """Deterministic reasoning + explanation for routine profiles."""
+        reasoning = _REASONING_TEMPLATE.format(
+            stage=profile.get("stage", "reported"),
+            disease=profile.get("disease_type", "the condition"),
+            treatment=treatment_type,
+            specialist=specialist,
+            timeline=timeline,
+        )
+        plan_data = {
+            "treatment_type": treatment_type,
+            "timeline": timeline,
+            "specialist": specialist,
+        }
+        return {
+            "reasoning": reasoning,
+            "explanation": default_explanation(profile, plan_data, reasoning),
+        }
+
+    def reason_and_explain(self, profile: dict, treatment_type: str, timeline: str,
+                           specialist: str, guideline_context: str, notes: str) -> dict:
+        """
+        Use a single Gemini call to produce both the clinical reasoning and the
+        patient-facing explanation.
+
+        Returns:
+            Dict with keys ``reasoning`` and ``explanation``
+        """
+        try:
+            prompt = _REASONING_PROMPT.format(
+                disease=profile.get("disease_type", "Unknown"),
+                stage=profile.get("stage", "Unknown"),
+                age=profile.get("age", "Unknown"),
+                gender=profile.get("gender", "Unknown"),
+                medical_history=profile.get("medical_history", "None stated"),
+                surgery_allowed=profile.get("surgery_allowed", True),
+                treatment_type=treatment_type,
+                timeline=timeline,
+                specialist=specialist,
+                guideline_context=guideline_context[:300] if guideline_context else "Standard guidelines",
+                notes=notes,
+            )
+            key = make_cache_key(
+                "reasoning",
+                profile.get("disease_type", ""),
+                profile.get("stage", ""),
+                profile.get("age", ""),
+                profile.get("gender", ""),
+                profile.get("medical_history", ""),
+                profile.get("surgery_allowed", True),
+                treatment_type,
+                timeline,
+                specialist,
+                notes,
+                guideline_context[:300] if guideline_context else "",
+            )
+            result = cached_generate(
+                get_model(), prompt, key,
+                parse=_parse_llm_json, generation_config=JSON_RESPONSE_CONFIG,
+            )
+            logger.debug("Gemini reasoning + explanation generated")
+            return result
         except Exception as e:
-            print(f"[DecisionEngine] Gemini reasoning failed: {e}")
-            return (
+            logger.warning("Gemini reasoning failed: %s", e)
+            reasoning = (
                 f"Based on the {profile.get('stage', 'reported')} stage of "
                 f"{profile.get('disease_type', 'the condition')}, "
                 f"{treatment_type} is the recommended approach per established clinical guidelines."
             )
+            plan_data = {
+                "treatment_type": treatment_type,
+                "timeline": timeline,
+                "specialist": specialist,
+            }
+            return {
+                "reasoning": reasoning,
+                "explanation": default_explanation(profile, plan_data, reasoning),
+                "fallback": True,
+            }
@@ -6,25 +6,87 @@ Responsibilities:
 - Add a medical disclaimer
 - Prepare the final structured JSON output
 """
-import google.generativeai as genai
-from backend.config import GEMINI_API_KEY
+import logging
+from backend.agents._llm import get_model, make_cache_key, cached_generate
 
-genai.configure(api_key=GEMINI_API_KEY)
-_model = genai.GenerativeModel("gemini-1.5-flash")
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
 
 DISCLAIMER = (
     "This is not a medical diagnosis. "
     "Consult a licensed medical professional before making any healthcare decisions."
 )
 
+# Gemini prompt for the patient-facing explanation
+_EXPLANATION_PROMPT = """
+You are a compassionate healthcare advisor explaining a treatment recommendation to a patient.
+
+Patient Details:
+- Disease: {disease}
+- Stage: {stage}
+- Age: {age}
+- Gender: {gender}
+- Surgery Allowed: {surgery_allowed}
+
+Recommended Treatment: {treatment_type}
+Timeline: {timeline}
+Clinical Reasoning: {llm_reasoning}
+
+Write a clear, empathetic 3-5 sentence explanation for the patient about:
+1. What treatment is recommended and why
+2. What they can expect in terms of timeline
+3. The importance of visiting a specialist
+
+Use simple language. Do not include any markdown or headers. Write as a single paragraph.
+"""
+
+
+def default_explanation(profile: dict, plan_data: dict, llm_reasoning: str) -> str:
+    """Template explanation used whenever Gemini output is unavailable."""
+    return (
+        f"Based on your {profile.get('stage', '')} {profile.get('disease_type', 'condition')}, "
+        f"the recommended treatment approach is {plan_data.get('treatment_type', 'medical management')}. "
+        f"The expected treatment timeline is {plan_data.get('timeline', 'to be determined by your specialist')}. "
+        f"{llm_reasoning} "
+        f"Please consult with a {plan_data.get('specialist', 'licensed medical professional')} "
+        f"for personalized guidance and to discuss your treatment options in detail."
+    )
+
+
+def format_hospital(h: dict) -> dict:
+    """Hospital fields in the output schema, minus the per-plan priority_rank."""
+    return {
+        "name": h.get("name", ""),
+        "location": f"{h.get('city', h.get('location', ''))}, {h.get('state', '')}".strip(", "),
+        "type": h.get("type", ""),
+        "contact": h.get("contact", ""),
+        "accreditation": h.get("accreditation", ""),
+        "rating": str(h.get("rating", "")),
+        "budget_category": h.get("budget_category", ""),
+    }
+
 
 class ExplanationEngine:
     """
     Generates the final structured JSON output with explanations and disclaimer.
     """
 
+    def __init__(self):
+        # hospital_id -> format_hospital() output; catalogue hospitals are
+        # formatted once per process and reused for every plan
+        self._formatted_by_id: dict[str, dict] = {}
+
+    def _format(self, h: dict) -> dict:
+        hospital_id = h.get("hospital_id")
+        if not hospital_id:
+            return format_hospital(h)
+        formatted = self._formatted_by_id.get(hospital_id)
+        if formatted is None:
+            formatted = self._formatted_by_id[hospital_id] = format_hospital(h)
+        return formatted
+
     def generate(self, profile: dict, plan_data: dict, ranked_hospitals: list[dict],
-                 llm_reasoning: str) -> dict:
+                 llm_reasoning: str, explanation: str | None = None) -> dict:
         """
         Combine all agent outputs into a final structured JSON response.
 
@@ -33,25 +95,24 @@ class ExplanationEngine:
             plan_data: Treatment plan dict from RecommendationEngine
             ranked_hospitals: Ranked hospital list
             llm_reasoning: Clinical reasoning from DecisionEngine
+            explanation: Patient explanation already produced by DecisionEngine
+                alongside the reasoning. Gemini is only called when omitted.
 
         Returns:
             Final structured output dict matching the required JSON schema
         """
-        explanation = self._generate_explanation(profile, plan_data, llm_reasoning)
-
-        # Format hospitals to required schema
-        formatted_hospitals = []
-        for h in ranked_hospitals[:5]:
-            formatted_hospitals.append({
-                "name": h.get("name", ""),
-                "location": f"{h.get('city', h.get('location', ''))}, {h.get('state', '')}".strip(", "),
-                "type": h.get("type", ""),
-                "contact": h.get("contact", ""),
-                "accreditation": h.get("accreditation", ""),
-                "rating": str(h.get("rating", "")),
-                "budget_category": h.get("budget_category", ""),
+        if explanation is None:
+            explanation = self._generate_explanation(profile, plan_data, llm_reasoning)
+
+        # Format hospitals to required schema; the static part is cached per
+        # catalogue hospital_id and copied into each plan's entry.
+        formatted_hospitals = [
+            {
+                **self._format(h),
                 "priority_rank": str(h.get("priority_rank", "")),
-            })
+            }
+            for h in ranked_hospitals[:5]
+        ]
 
         output = {
             "treatment_plan": {
@@ -67,45 +128,43 @@ class ExplanationEngine:
             "disclaimer": DISCLAIMER,
         }
 
-        print("[ExplanationEngine] Final output prepared.")
+        logger.debug("Final output prepared")
         return output
 
+    @staticmethod
+    def _explanation_prompt(profile: dict, plan_data: dict, llm_reasoning: str) -> tuple[str, str]:
+        """Build the patient-explanation prompt and its cache key."""
+        prompt = _EXPLANATION_PROMPT.format(
+            disease=profile.get("disease_type", "Unknown"),
+            stage=profile.get("stage", "Unknown"),
+            age=profile.get("age", "Unknown"),
+            gender=profile.get("gender", "Unknown"),
+            surgery_allowed=profile.get("surgery_allowed", True),
+            treatment_type=plan_data.get("treatment_type", ""),
+            timeline=plan_data.get("timeline", ""),
+            llm_reasoning=llm_reasoning,
+        )
+        key = make_cache_key(
+            "explanation",
+            profile.get("disease_type", ""),
+            profile.get("stage", ""),
+            profile.get("age", ""),
+            profile.get("gender", ""),
+            profile.get("surgery_allowed", True),
+            plan_data.get("treatment_type", ""),
+            plan_data.get("timeline", ""),
+            llm_reasoning,
+        )
+        return prompt, key
+
     def _generate_explanation(self, profile: dict, plan_data: dict, llm_reasoning: str) -> str:
         """Generate a clear, patient-friendly explanation using Gemini."""
         try:
-            prompt = f"""
-You are a compassionate healthcare advisor explaining a treatment recommendation to a patient.
-
-Patient Details:
-- Disease: {profile.get('disease_type', 'Unknown')}
-- Stage: {profile.get('stage', 'Unknown')}
-- Age: {profile.get('age', 'Unknown')}
-- Gender: {profile.get('gender', 'Unknown')}
-- Surgery Allowed: {profile.get('surgery_allowed', True)}
-
-Recommended Treatment: {plan_data.get('treatment_type', '')}
-Timeline: {plan_data.get('timeline', '')}
-Clinical Reasoning: {llm_reasoning}
-
-Write a clear, empathetic 3-5 sentence explanation for the patient about:
-1. What treatment is recommended and why
-2. What they can expect in terms of timeline
-3. The importance of visiting a specialist
-
-Use simple language. Do not include any markdown or headers. Write as a single paragraph.
-"""
-            response = _model.generate_content(prompt)
-            explanation = response.text.strip()
-            print("[ExplanationEngine] Gemini explanation generated.")
+            prompt, key = self._explanation_prompt(profile, plan_data, llm_reasoning)
+            explanation = cached_generate(get_model(), prompt, key)
+            logger.debug("Gemini explanation generated")
             return explanation
 
         except Exception as e:
-            print(f"[ExplanationEngine] Gemini failed, using default explanation: {e}")
-            return (
-                f"Based on your {profile.get('stage', '')} {profile.get('disease_type', 'condition')}, "
-                f"the recommended treatment approach is {plan_data.get('treatment_type', 'medical management')}. "
-                f"The expected treatment timeline is {plan_data.get('timeline', 'to be determined by your specialist')}. "
-                f"{llm_reasoning} "
-                f"Please consult with a {plan_data.get('specialist', 'licensed medical professional')} "
-                f"for personalized guidance and to discuss your treatment options in detail."
-            )
+            logger.warning("Gemini failed, using default explanation: %s", e)
+            return default_explanation(profile, plan_data, llm_reasoning)
@@ -6,10 +6,112 @@ Responsibilities:
 - Store the medical profile in PostgreSQL
 - Fetch existing profiles by user_id or profile_id
 """
-from datetime import datetime
+import functools
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from types import MappingProxyType
+from typing import AsyncIterator, Mapping
+from cachetools import LRUCache, TTLCache
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from backend.db.models import MedicalProfile, Constraint, User, UserSession
+from sqlalchemy import select, insert, update, func, bindparam
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import load_only, make_transient_to_detached
+from backend.db.models import MedicalProfile, Constraint, User, UserSession, generate_uuid
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# store_profiles switches from batched INSERTs to PostgreSQL COPY above this size
+COPY_THRESHOLD = 10_000
+
+# Prebuilt statements: constructed once, and SQLAlchemy's compiled cache does the rest
+_USER_PROFILES_STMT = (
+    select(MedicalProfile)
+    .where(MedicalProfile.user_id == bindparam("user_id"))
+    .options(load_only(
+        MedicalProfile.profile_id,
+        MedicalProfile.disease_type,
+        MedicalProfile.stage,
+        MedicalProfile.created_at,
+    ))
+    .order_by(MedicalProfile.created_at)
+)
+
+# Defaults for every response field the mapping reads
+_RESPONSE_DEFAULTS = {
+    "disease_type": "",
+    "stage": "",
+    "medical_history": "",
+    "gender": "",
+    "symptoms": "",
+    "surgery_allowed": "yes",
+    "age": 0,
+    "budget_limit": None,
+    "location_type": "national",
+    "hospital_preference": "private",
+}
+# Text fields copied verbatim onto the MedicalProfile
+_PROFILE_TEXT_KEYS = ("disease_type", "stage", "medical_history", "gender", "symptoms")
+
+# Answers treated as "yes" for surgery_allowed
+_TRUE = frozenset({"yes", "true", "1", "y"})
+
+# Thousands separators, whitespace and the currency code stripped from budgets
+_BUDGET_STRIP = re.compile(r"[,\s]|INR", re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_budget_text(text: str) -> float | None:
+    """Parse a budget answer; memoised since bulk imports repeat a few values."""
+    try:
+        return float(_BUDGET_STRIP.sub("", text))
+    except ValueError:
+        return None
+
+
+# email -> User column snapshot; spares the SELECT for returning users
+USER_CACHE_TTL_SECONDS = 60
+_USER_COLUMNS = ("user_id", "name", "email", "location", "budget", "created_at")
+_user_cache: TTLCache = TTLCache(maxsize=10_000, ttl=USER_CACHE_TTL_SECONDS)
+_user_cache_lock = threading.Lock()
+
+
+def invalidate_user(email: str) -> None:
+    """Drop the cached snapshot for ``email`` (call after updating the user)."""
+    with _user_cache_lock:
+        _user_cache.pop(email, None)
+
+
+def _remember_user(user: User) -> None:
+    with _user_cache_lock:
+        _user_cache[user.email] = {c: getattr(user, c) for c in _USER_COLUMNS}
+
+
+def _cached_user(email: str) -> User | None:
+    """A detached User rebuilt from the cached column values, if any."""
+    with _user_cache_lock:
+        cached = _user_cache.get(email)
+    if cached is None:
+        return None
+    user = User(**cached)
+    make_transient_to_detached(user)
+    return user
+
+
+# (user_id, response items) -> MappedResponses; the mapping is pure, so retries
+# and re-submitted questionnaires reuse the earlier result
+_mapping_cache: LRUCache = LRUCache(maxsize=512)
+_mapping_lock = threading.Lock()
+
+
+@dataclass(slots=True, frozen=True)
+class MappedResponses:
+    """Read-only column values for a MedicalProfile and its Constraint."""
+    profile: Mapping
+    constraint: Mapping
 
 
 class MedicalDataService:
@@ -17,134 +119,259 @@ class MedicalDataService:
     Manages medical profile data: mapping, storing, and fetching from PostgreSQL.
     """
 
-    def map_responses_to_profile(self, user_id: str, responses: dict) -> dict:
+    def map_responses_to_profile(self, user_id: str, responses: dict) -> MappedResponses:
         """
         Map raw user question responses to MedicalProfile fields.
 
+        Results are memoised per (user_id, responses); the returned mappings
+        are read-only because they may be shared between calls.
+
         Args:
             user_id: The user's UUID
             responses: Dict of field -> answer from QuestionService
 
         Returns:
-            Dict suitable for creating a MedicalProfile ORM object
+            MappedResponses with the profile and constraint column values
         """
+        try:
+            key = (user_id, frozenset(responses.items()))
+        except TypeError:  # unhashable answer (e.g. a list): map without memo
+            return self._map_responses(user_id, responses)
+
+        with _mapping_lock:
+            mapped = _mapping_cache.get(key)
+        if mapped is None:
+            mapped = self._map_responses(user_id, responses)
+            with _mapping_lock:
+                _mapping_cache[key] = mapped
+        return mapped
+
+    def _map_responses(self, user_id: str, responses: dict) -> MappedResponses:
+        data = _RESPONSE_DEFAULTS | responses
+
         # Parse surgery_allowed from text to bool
-        surgery_raw = responses.get("surgery_allowed", "yes")
+        surgery_raw = data["surgery_allowed"]
         if isinstance(surgery_raw, bool):
             surgery_allowed = surgery_raw
         else:
-            surgery_allowed = str(surgery_raw).lower() in ("yes", "true", "1", "y")
+            surgery_allowed = str(surgery_raw).strip().lower() in _TRUE
 
         # Parse age to int
         try:
-            age = int(responses.get("age", 0))
+            age = int(data["age"])
         except (ValueError, TypeError):
             age = None
 
-        profile_data = {
-            "user_id": user_id,
-            "disease_type": responses.get("disease_type", ""),
-            "cancer_type": responses.get("cancer_type", responses.get("disease_type", "")),
-            "stage": responses.get("stage", ""),
-            "medical_history": responses.get("medical_history", ""),
-            "surgery_allowed": surgery_allowed,
-            "age": age,
-            "gender": responses.get("gender", ""),
-            "symptoms": responses.get("symptoms", ""),
-        }
+        profile_data = {k: data[k] for k in _PROFILE_TEXT_KEYS}
+        profile_data["user_id"] = user_id
+        profile_data["cancer_type"] = data.get("cancer_type", data["disease_type"])
+        profile_data["surgery_allowed"] = surgery_allowed
+        profile_data["age"] = age
 
         constraint_data = {
-            "budget_limit": self._parse_budget(responses.get("budget_limit")),
-            "location_type": responses.get("location_type", "national"),
-            "hospital_preference": responses.get("hospital_preference", "private"),
+            "budget_limit": self._parse_budget(data["budget_limit"]),
+            "location_type": data["location_type"],
+            "hospital_preference": data["hospital_preference"],
         }
 
-        print(f"[MedicalDataService] Mapped profile for user {user_id}.")
-        return {"profile": profile_data, "constraint": constraint_data}
+        logger.debug("Mapped profile for user %s", user_id)
+        return MappedResponses(
+            profile=MappingProxyType(profile_data),
+            constraint=MappingProxyType(constraint_data),
+        )
 
     def _parse_budget(self, value) -> float | None:
         """Parse budget value to float."""
         if value is None:
             return None
-        try:
-            cleaned = str(value).replace(",", "").replace("INR", "").strip()
-            return float(cleaned)
-        except (ValueError, TypeError):
-            return None
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return float(value)
+        return _parse_budget_text(str(value))
 
-    async def store_profile(self, db: AsyncSession, user_id: str, responses: dict) -> MedicalProfile:
+    async def store_profile(self, db: AsyncSession, user_id: str,
+                            responses: dict) -> tuple[MedicalProfile, Constraint]:
         """
         Create and persist a MedicalProfile (and its Constraint) from user responses.
 
         Args:
-            db: Async SQLAlchemy session
+            db: Async SQLAlchemy session with no transaction in progress
             user_id: The user's UUID
             responses: Dict of question field -> answer
 
         Returns:
-            The newly created MedicalProfile ORM instance
+            (profile, constraint) — the newly created ORM instances
         """
         mapped = self.map_responses_to_profile(user_id, responses)
-        profile_data = mapped["profile"]
-        constraint_data = mapped["constraint"]
+        profile_data = mapped.profile
+        constraint_data = mapped.constraint
+
+        # Both inserts share one BEGIN ... COMMIT; either both land or neither
+        async with db.begin():
+            # Create MedicalProfile; RETURNING hands back the full row (incl. PK)
+            profile = await db.scalar(
+                insert(MedicalProfile).values(**profile_data).returning(MedicalProfile)
+            )
+
+            # Create associated Constraint; RETURNING spares the caller a SELECT
+            constraint = await db.scalar(
+                insert(Constraint)
+                .values(profile_id=profile.profile_id, **constraint_data)
+                .returning(Constraint)
+            )
+        logger.debug("Profile %s stored in DB", profile.profile_id)
+        return profile, constraint
+
+
+    async def store_profiles(self, db: AsyncSession, items: list[tuple[str, dict]]) -> list[str]:
+        """
+        Bulk variant of store_profile for seed jobs and imports.
 
-        # Create MedicalProfile
-        profile = MedicalProfile(**profile_data)
-        db.add(profile)
-        await db.flush()  # get profile_id before commit
+        Primary keys are generated client-side so profiles and constraints go
+        out as two batched statements (or two COPYs for very large inputs)
+        without reading ids back.
 
-        # Create associated Constraint
-        constraint = Constraint(profile_id=profile.profile_id, **constraint_data)
-        db.add(constraint)
+        Args:
+            db: Async SQLAlchemy session
+            items: (user_id, responses) pairs
+
+        Returns:
+            The new profile_ids, in input order
+        """
+        profile_rows, constraint_rows = [], []
+        for user_id, responses in items:
+            mapped = self.map_responses_to_profile(user_id, responses)
+            profile_id = generate_uuid()
+            profile_rows.append({"profile_id": profile_id, **mapped.profile})
+            constraint_rows.append({
+                "constraint_id": generate_uuid(),
+                "profile_id": profile_id,
+                **mapped.constraint,
+            })
+        if not profile_rows:
+            return []
+
+        if len(profile_rows) > COPY_THRESHOLD:
+            await self._copy_rows(db, profile_rows, constraint_rows)
+        else:
+            await db.execute(insert(MedicalProfile), profile_rows)
+            await db.execute(insert(Constraint), constraint_rows)
 
         await db.commit()
-        await db.refresh(profile)
-        print(f"[MedicalDataService] Profile {profile.profile_id} stored in DB.")
-        return profile
+        logger.info("%d profiles stored in DB", len(profile_rows))
+        return [row["profile_id"] for row in profile_rows]
 
-    async def fetch_profile(self, db: AsyncSession, profile_id: str) -> MedicalProfile | None:
-        """Fetch a MedicalProfile by profile_id."""
-        result = await db.execute(
-            select(MedicalProfile).where(MedicalProfile.profile_id == profile_id)
-        )
-        return result.scalar_one_or_none()
+    async def _copy_rows(self, db: AsyncSession, profile_rows: list[dict],
+                         constraint_rows: list[dict]) -> None:
+        """COPY pre-mapped rows straight into PostgreSQL via asyncpg."""
+        # COPY skips column defaults, so fill the timestamps ourselves
+        # (naive UTC, matching the TIMESTAMP WITHOUT TIME ZONE columns)
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        profile_cols = [*profile_rows[0], "created_at", "updated_at"]
+        constraint_cols = [*constraint_rows[0], "created_at"]
 
-    async def fetch_user_profiles(self, db: AsyncSession, user_id: str) -> list[MedicalProfile]:
-        """Fetch all MedicalProfiles for a given user."""
-        result = await db.execute(
-            select(MedicalProfile).where(MedicalProfile.user_id == user_id)
+        conn = await db.connection()
+        raw = (await conn.get_raw_connection()).driver_connection
+        await raw.copy_records_to_table(
+            MedicalProfile.__tablename__,
+            columns=profile_cols,
+            records=[(*row.values(), now, now) for row in profile_rows],
+        )
+        await raw.copy_records_to_table(
+            Constraint.__tablename__,
+            columns=constraint_cols,
+            records=[(*row.values(), now) for row in constraint_rows],
         )
-        return list(result.scalars().all())
+
+    async def fetch_profile(self, db: AsyncSession, profile_id: str) -> MedicalProfile | None:
+        """Fetch a MedicalProfile by profile_id (identity map first, then PK lookup)."""
+        return await db.get(MedicalProfile, profile_id)
+
+    async def fetch_user_profiles(self, db: AsyncSession, user_id: str) -> AsyncIterator[MedicalProfile]:
+        """
+        Stream summaries of all MedicalProfiles for a given user.
+
+        Rows are yielded as the server-side cursor delivers them rather than
+        buffered into a list. Only profile_id, disease_type, stage and
+        created_at are loaded; use fetch_profile for the full record.
+        """
+        result = await db.stream_scalars(_USER_PROFILES_STMT, {"user_id": user_id})
+        async for profile in result:
+            yield profile
 
     async def get_or_create_user(self, db: AsyncSession, name: str, email: str,
                                   location: str = "", budget: float = None) -> User:
-        """Get an existing user by email or create a new one."""
-        result = await db.execute(select(User).where(User.email == email))
-        user = result.scalar_one_or_none()
-        if not user:
-            user = User(name=name, email=email, location=location, budget=budget)
-            db.add(user)
+        """
+        Get an existing user by email or create a new one.
+
+        Recently seen users are served from a short-lived in-process cache as
+        a detached User carrying only the column values.
+        """
+        user = _cached_user(email)
+        if user is None:
+            user = await self._upsert_user(db, name, email, location, budget)
             await db.commit()
-            await db.refresh(user)
-            print(f"[MedicalDataService] Created new user {user.user_id}.")
+            # Cache only committed rows, never a user a rollback could undo
+            _remember_user(user)
         return user
 
     async def create_session(self, db: AsyncSession, user_id: str, goal: str) -> UserSession:
         """Create a new UserSession."""
-        session = UserSession(user_id=user_id, goal=goal)
-        db.add(session)
+        session = await self._insert_session(db, user_id, goal)
         await db.commit()
-        await db.refresh(session)
-        print(f"[MedicalDataService] Session {session.session_id} created.")
+        return session
+
+    async def start_session(self, db: AsyncSession, name: str, email: str,
+                            location: str = "", budget: float = None,
+                            goal: str = "pending") -> tuple[User, UserSession]:
+        """
+        Resolve the user and open a session for them in one transaction.
+
+        Args:
+            db: Async SQLAlchemy session with no transaction in progress
+
+        Returns:
+            (user, session)
+        """
+        cached = _cached_user(email)
+        async with db.begin():
+            user = cached or await self._upsert_user(db, name, email, location, budget)
+            session = await self._insert_session(db, user.user_id, goal)
+        # Reached only once the block has committed; a rolled-back user
+        # must not be served from the cache
+        if cached is None:
+            _remember_user(user)
+        return user, session
+
+    async def _upsert_user(self, db: AsyncSession, name: str, email: str,
+                           location: str, budget: float | None) -> User:
+        """Upsert the user row by email; the caller owns the transaction."""
+        # Single round-trip upsert on the unique email: the no-op update makes
+        # RETURNING yield the existing row too, and closes the signup race.
+        stmt = (
+            pg_insert(User)
+            .values(name=name, email=email, location=location, budget=budget)
+            .on_conflict_do_update(index_elements=[User.email], set_={"email": email})
+            .returning(User)
+        )
+        user = await db.scalar(stmt, execution_options={"populate_existing": True})
+        logger.debug("Resolved user %s", user.user_id)
+        return user
+
+    async def _insert_session(self, db: AsyncSession, user_id: str, goal: str) -> UserSession:
+        """Insert a UserSession row; the caller owns the transaction."""
+        session = await db.scalar(
+            insert(UserSession).values(user_id=user_id, goal=goal).returning(UserSession)
+        )
+        logger.debug("Session %s created", session.session_id)
         return session
 
     async def end_session(self, db: AsyncSession, session_id: str) -> None:
         """Mark a session as completed."""
-        result = await db.execute(
-            select(UserSession).where(UserSession.session_id == session_id)
+        # One UPDATE stamped with the server's timestamptz; already-completed
+        # sessions keep their original end_time.
+        await db.execute(
+            update(UserSession)
+            .where(UserSession.session_id == session_id, UserSession.status != "completed")
+            .values(end_time=func.now(), status="completed")
         )
-        session = result.scalar_one_or_none()
-        if session:
-            session.end_time = datetime.utcnow()
-            session.status = "completed"
-            await db.commit()
+        await db.commit()
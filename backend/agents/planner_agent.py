@@ -26,20 +26,187 @@ Execution order enforced exactly per the AI Healthcare Assistant Process Flow Di
   21. End Session → end_session()
 """
 
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
 import uuid
 import datetime
-from typing import Optional
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field, fields
+from typing import Any, Optional
 
-from backend.agents.question_service import QuestionService
-from backend.agents.medical_data_service import MedicalDataService
-from backend.agents.validation_engine import ValidationEngine
-from backend.agents.decision_engine import DecisionEngine
-from backend.agents.recommendation_engine import RecommendationEngine
-from backend.agents.explanation_engine import ExplanationEngine
+from cachetools import TTLCache
+
+from backend.config import SURGICAL_KEYWORDS, AUDIT_TRAIL_ENABLED, FOLLOWUPS_ENABLED
+
+from backend.agents._registry import (
+    get_question_service,
+    get_medical_data_service,
+    get_validation_engine,
+    get_decision_engine,
+    get_recommendation_engine,
+    get_explanation_engine,
+)
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
 
 # Maximum times the data-collection loop may repeat before forcing progression
 MAX_RETRY_LOOPS = 3
 
+# Audit entries kept in memory per session; older ones are evicted first
+AUDIT_TRAIL_MAXLEN = 1024
+
+# Validation results remembered per session for repeated answer sets
+VALIDATION_CACHE_SIZE = 16
+
+# Follow-up reminders: (type, days from today, message template)
+_REMINDER_SPECS = (
+    ("Initial Consultation", 7,
+     "Schedule your first specialist appointment for {disease_type}."),
+    ("Diagnostic Reports", 14,
+     "Collect all required diagnostic reports before your appointment."),
+    ("Treatment Follow-up", 30,
+     "Follow-up with your specialist regarding treatment progress. "
+     "Expected timeline: {timeline}."),
+)
+
+# Completed analyses (steps 11–17) keyed on (goal, responses); a repeat
+# submission skips the DecisionEngine / Gemini / ChromaDB chain entirely
+RESPONSE_CACHE_MAXSIZE = 4096
+RESPONSE_CACHE_TTL_SECONDS = 3600
+
+_RESPONSE_CACHE: TTLCache = TTLCache(
+    maxsize=RESPONSE_CACHE_MAXSIZE, ttl=RESPONSE_CACHE_TTL_SECONDS
+)
+_response_lock = threading.Lock()
+
+
+def _response_key(goal: Optional[str], responses: dict) -> str:
+    """Stable digest of the goal and the merged answers."""
+    payload = json.dumps(
+        {"goal": goal, "answers": responses}, sort_keys=True, default=str
+    )
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def clear_response_cache() -> None:
+    """Drop every cached analysis (e.g. after the knowledge files change)."""
+    with _response_lock:
+        _RESPONSE_CACHE.clear()
+
+
+def _utc_iso(ts: Optional[float] = None) -> str:
+    """ISO-8601 UTC timestamp with a ``Z`` suffix, for ``ts`` or now."""
+    if ts is None:
+        ts = time.time()
+    return (
+        datetime.datetime.fromtimestamp(ts, datetime.timezone.utc)
+        .isoformat().replace("+00:00", "Z")
+    )
+
+
+# Profile fields copied from the answers as-is, with their defaults;
+# cancer_type and surgery_allowed are derived separately
+_PROFILE_SPEC = (
+    ("disease_type",    ""),
+    ("stage",           ""),
+    ("medical_history", ""),
+    ("age",             ""),
+    ("gender",          ""),
+    ("symptoms",        ""),
+)
+
+# Text columns of a stored MedicalProfile, read back with "" for NULL
+_PROFILE_TEXT_FIELDS = ("disease_type", "stage", "medical_history", "gender", "symptoms")
+
+# Constraint fields and the value used when the patient did not answer
+_CONSTRAINT_DEFAULTS = {
+    "budget_limit":        None,
+    "location_type":       "national",
+    "hospital_preference": "private",
+}
+
+
+def _constraint_from(answers: dict) -> dict:
+    """Overlay the answered constraint fields on the defaults in one merge."""
+    return _CONSTRAINT_DEFAULTS | {
+        k: answers[k] for k in _CONSTRAINT_DEFAULTS.keys() & answers.keys()
+    }
+
+
+# Treatment values that count as "no treatment decided"
+_UNDEFINED_TREATMENTS = frozenset({"", "unknown", "tbd"})
+
+# Surgical terms the compliance check flags when the patient opted out of
+# surgery; one alternation scans the treatment text in a single pass
+_COMPLIANCE_SURGICAL_RE = re.compile(
+    "|".join(
+        re.escape(k) for k in sorted(
+            {"surgery", "surgical", "mastectomy", "lumpectomy", "cabg",
+             "resection", "amputation", *SURGICAL_KEYWORDS}
+        )
+    )
+)
+
+
+@dataclass(slots=True)
+class PlannerState:
+    """
+    Per-session planner state.
+
+    Steps use attribute access; ``state["key"]`` / ``state.get("key")`` keep
+    working for the API routes, the Streamlit frontend and the tests.
+    """
+    goal: Optional[str] = None
+    questions: list = field(default_factory=list)
+    responses: dict = field(default_factory=dict)
+    profile: dict = field(default_factory=dict)
+    constraint: dict = field(default_factory=dict)
+    validation_result: dict = field(default_factory=dict)
+    decision: dict = field(default_factory=dict)
+    recommendation: dict = field(default_factory=dict)
+    final_output: dict = field(default_factory=dict)
+    status: str = "idle"                  # lifecycle status
+    retry_count: int = 0
+    missing_fields: list = field(default_factory=list)
+    # ── New fields per process-flow diagram ──────────────────────────────────
+    authenticated: bool = False
+    access_token: Optional[str] = None
+    session_id: Optional[str] = None
+    user_id: Optional[str] = None
+    audit_trail: deque = field(                       # most recent audit log entries
+        default_factory=lambda: deque(maxlen=AUDIT_TRAIL_MAXLEN)
+    )
+    followups: list = field(default_factory=list)     # scheduled follow-up reminders
+    compliance_status: str = "pending"    # 'compliant' | 'flagged'
+    manual_review_flagged: bool = False
+    session_ended: bool = False
+
+    # ── Mapping-style access for existing callers ────────────────────────────
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def to_dict(self) -> dict:
+        """Shallow dict snapshot of every field."""
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
 
 class PlannerAgent:
     """
@@ -58,39 +225,46 @@ class PlannerAgent:
         self.subtasks: list[str] = []
         self.execution_plan: dict = {}
 
-        # Flat state dict — a single source of truth across all steps
-        self.state: dict = {
-            "goal": None,
-            "questions": [],
-            "responses": {},
-            "profile": {},
-            "constraint": {},
-            "validation_result": {},
-            "decision": {},
-            "recommendation": {},
-            "final_output": {},
-            "status": "idle",                 # lifecycle status
-            "retry_count": 0,
-            "missing_fields": [],
-            # ── New fields per process-flow diagram ──────────────────────────
-            "authenticated": False,
-            "access_token": None,
-            "session_id": None,
-            "user_id": None,
-            "audit_trail": [],                # ordered list of audit log entries
-            "followups": [],                  # scheduled follow-up reminders
-            "compliance_status": "pending",   # 'compliant' | 'flagged'
-            "manual_review_flagged": False,
-            "session_ended": False,
-        }
+        # Slotted state record — a single source of truth across all steps
+        self.state = PlannerState()
+
+        # Raw (epoch, step, status, detail) tuples from _log, materialised into
+        # state.audit_trail in one pass by _flush_audit()
+        self._audit_buffer: deque[tuple[float, str, str, str]] = deque(
+            maxlen=AUDIT_TRAIL_MAXLEN
+        )
+
+        # Recent validations keyed on the frozen responses (LRU, per session);
+        # a resubmission with already-seen answers skips the ValidationEngine
+        self._validation_cache: OrderedDict[frozenset, dict] = OrderedDict()
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Sub-agents — stateless, shared process-wide, and resolved on first use
+    # so steps that never reach them do not import ChromaDB / Gemini / asyncpg
+    # ─────────────────────────────────────────────────────────────────────────
+    @property
+    def _question_service(self):
+        return get_question_service()
 
-        # Sub-agent instances (one per PlannerAgent lifetime)
-        self._question_service    = QuestionService()
-        self._medical_data_service = MedicalDataService()
-        self._validation_engine   = ValidationEngine()
-        self._decision_engine     = DecisionEngine()
-        self._recommendation_engine = RecommendationEngine()
-        self._explanation_engine  = ExplanationEngine()
+    @property
+    def _medical_data_service(self):
+        return get_medical_data_service()
+
+    @property
+    def _validation_engine(self):
+        return get_validation_engine()
+
+    @property
+    def _decision_engine(self):
+        return get_decision_engine()
+
+    @property
+    def _recommendation_engine(self):
+        return get_recommendation_engine()
+
+    @property
+    def _explanation_engine(self):
+        return get_explanation_engine()
 
     # =========================================================================
     # STEP 1 — Goal Reception  (was receiveGoal)
@@ -98,10 +272,10 @@ class PlannerAgent:
     def receiveGoal(self, goal: str) -> str:
         """Receive and store the user's healthcare goal (Step 1)."""
         self.goal = goal.strip()
-        self.state["goal"]   = self.goal
-        self.state["status"] = "goal_received"
+        self.state.goal   = self.goal
+        self.state.status = "goal_received"
         self._log("Goal received", detail=self.goal)
-        print(f"[PlannerAgent] Goal received: '{self.goal}'")
+        logger.info("Goal received: %r", self.goal)
         return self.goal
 
     # Alias for cleaner internal calls
@@ -144,14 +318,14 @@ class PlannerAgent:
                 payload = None
 
             if payload:
-                self.state["authenticated"] = True
-                self.state["user_id"]       = payload["user_id"]
-                self.state["session_id"]    = payload["session_id"]
-                self.state["access_token"]  = access_token
-                self.state["status"]        = "authenticated"
+                self.state.authenticated = True
+                self.state.user_id       = payload["user_id"]
+                self.state.session_id    = payload["session_id"]
+                self.state.access_token  = access_token
+                self.state.status        = "authenticated"
                 self._log("Token validated",
                           detail=f"user_id={payload['user_id']}")
-                print(f"[PlannerAgent] ✅ Token validated. user_id={payload['user_id']}")
+                logger.info("Token validated: user_id=%s", payload["user_id"])
                 return {
                     "authenticated": True,
                     "error": None,
@@ -160,10 +334,10 @@ class PlannerAgent:
                     "session_id": payload["session_id"],
                 }
             else:
-                self.state["authenticated"] = False
-                self.state["status"]        = "auth_failed"
+                self.state.authenticated = False
+                self.state.status        = "auth_failed"
                 self._log("Token invalid or expired — retry required")
-                print("[PlannerAgent] ❌ Token invalid or expired.")
+                logger.warning("Token invalid or expired")
                 return {
                     "authenticated": False,
                     "error": "Invalid or expired access token. Please log in again.",
@@ -174,27 +348,27 @@ class PlannerAgent:
 
         # ── Path 2: Legacy bypass (authenticated=True, no token) ──────────────
         if authenticated:
-            self.state["user_id"]       = user_id or str(uuid.uuid4())
-            self.state["session_id"]    = session_id or str(uuid.uuid4())
-            self.state["authenticated"] = True
-            self.state["access_token"]  = None
-            self.state["status"]        = "authenticated"
+            self.state.user_id       = user_id or str(uuid.uuid4())
+            self.state.session_id    = session_id or str(uuid.uuid4())
+            self.state.authenticated = True
+            self.state.access_token  = None
+            self.state.status        = "authenticated"
             self._log("Authentication bypassed (direct mode)",
-                      detail=f"user_id={self.state['user_id']}")
-            print(f"[PlannerAgent] ✅ Direct-mode auth. user_id={self.state['user_id']}")
+                      detail=f"user_id={self.state.user_id}")
+            logger.info("Direct-mode auth: user_id=%s", self.state.user_id)
             return {
                 "authenticated": True,
                 "error": None,
                 "retry": False,
-                "user_id":    self.state["user_id"],
-                "session_id": self.state["session_id"],
+                "user_id":    self.state.user_id,
+                "session_id": self.state.session_id,
             }
 
         # ── Path 3: No token, not bypassed → fail ────────────────────────────
-        self.state["authenticated"] = False
-        self.state["status"]        = "auth_failed"
+        self.state.authenticated = False
+        self.state.status        = "auth_failed"
         self._log("Authentication failed — no token supplied")
-        print("[PlannerAgent] ❌ No access token supplied.")
+        logger.warning("No access token supplied")
         return {
             "authenticated": False,
             "error": "No access token provided. Please log in first.",
@@ -212,16 +386,16 @@ class PlannerAgent:
         Verify the stored user identity before generating an access token (Step 3).
         Returns True if identity is confirmed, False otherwise.
         """
-        if not self.state.get("authenticated"):
+        if not self.state.authenticated:
             self._log("Identity verification skipped — not authenticated")
             return False
 
         # In a real system this would cross-check against the User table.
         # Here we assert identity is valid if a user_id is present.
-        identity_confirmed = bool(self.state.get("user_id"))
-        self.state["status"] = "identity_verified" if identity_confirmed else "identity_failed"
+        identity_confirmed = bool(self.state.user_id)
+        self.state.status = "identity_verified" if identity_confirmed else "identity_failed"
         self._log("Identity verified", detail=str(identity_confirmed))
-        print(f"[PlannerAgent] Identity verified: {identity_confirmed}")
+        logger.debug("Identity verified: %s", identity_confirmed)
         return identity_confirmed
 
     # =========================================================================
@@ -232,11 +406,11 @@ class PlannerAgent:
         Generate a session-scoped access token (Step 4).
         Returns the token string.
         """
-        token = f"hca-token-{self.state['session_id']}-{uuid.uuid4().hex[:12]}"
-        self.state["access_token"] = token
-        self.state["status"] = "token_generated"
+        token = f"hca-token-{self.state.session_id}-{uuid.uuid4().hex[:12]}"
+        self.state.access_token = token
+        self.state.status = "token_generated"
         self._log("Access token generated", detail=token[:24] + "…")
-        print(f"[PlannerAgent] Access token generated.")
+        logger.debug("Access token generated")
         return token
 
     # =========================================================================
@@ -257,9 +431,9 @@ class PlannerAgent:
             "10. Add medical disclaimer and explanation",
             "11. Prepare final structured recommendation",
         ]
-        self.state["status"] = "goal_decomposed"
+        self.state.status = "goal_decomposed"
         self._log("Goal decomposed", detail=f"{len(self.subtasks)} subtasks")
-        print(f"[PlannerAgent] Goal decomposed into {len(self.subtasks)} subtasks.")
+        logger.debug("Goal decomposed into %d subtasks", len(self.subtasks))
         return self.subtasks
 
     # =========================================================================
@@ -286,9 +460,11 @@ class PlannerAgent:
             "max_retries": MAX_RETRY_LOOPS,
             "status": "planned",
         }
-        self.state["status"] = "plan_created"
+        self.state.status = "plan_created"
         self._log("Execution plan created")
-        print("[PlannerAgent] Execution plan created.")
+        # Overlap DecisionEngine warm-up with the user answering questions
+        self._decision_engine.prefetch_for_goal(self.goal)
+        logger.debug("Execution plan created")
         return self.execution_plan
 
     # =========================================================================
@@ -296,12 +472,12 @@ class PlannerAgent:
     # =========================================================================
     def generateQuestions(self) -> list[dict]:
         """Trigger QuestionService to generate medical questions (Step 7)."""
-        self.state["status"] = "generating_questions"
+        self.state.status = "generating_questions"
         questions = self._question_service.generate_questions(self.goal)
-        self.state["questions"] = questions
-        self.state["status"] = "questions_ready"
+        self.state.questions = questions
+        self.state.status = "questions_ready"
         self._log("Questions generated", detail=f"{len(questions)} questions")
-        print(f"[PlannerAgent] {len(questions)} questions ready for user.")
+        logger.debug("%d questions ready for user", len(questions))
         return questions
 
     # =========================================================================
@@ -316,55 +492,40 @@ class PlannerAgent:
               store via MedicalDataService (in-memory for stateless calls)
               re-run ValidationEngine
 
-        Controlled ONLY by PlannerAgent.
-        Returns the final validation result dict.
+        Controlled ONLY by PlannerAgent. Each call is one round of the loop;
+        the caller re-enters with new answers until the data is complete or
+        MAX_RETRY_LOOPS rounds have passed.
+        Returns this round's validation result dict.
         """
-        # Merge incoming answers with any previously collected ones
-        self.state["responses"].update(answers)
-        self.state["retry_count"] += 1
-        loop_count = 0
-
-        self._log("Data-collection loop started", detail=f"retry #{self.state['retry_count']}")
-
-        while loop_count < MAX_RETRY_LOOPS:
-            loop_count += 1
-            print(f"[PlannerAgent] 🔄 Data-collection loop iteration {loop_count}…")
-
-            # Run ValidationEngine on current responses
-            validation = self._validation_engine.validate_from_responses(
-                self.state["responses"]
-            )
-            self.state["validation_result"] = validation
-            self.state["missing_fields"]    = validation.get("missing_fields", [])
-
-            if validation["is_valid"]:
-                self.state["status"] = "validation_passed"
-                self._log("Validation passed", detail=f"iteration {loop_count}")
-                print("[PlannerAgent] ✅ Data complete — exiting collection loop.")
-                break
-
-            # Data incomplete — request missing information
-            self.state["status"] = "needs_more_data"
-            self._log(
-                "Data incomplete — requesting missing fields",
-                detail=str(validation["missing_fields"]),
-            )
-            print(
-                f"[PlannerAgent] ⚠️  Missing fields: {validation['missing_fields']}. "
-                f"Loop iteration {loop_count}/{MAX_RETRY_LOOPS}."
-            )
-
-            # If we have exhausted retries, break and continue with partial data
-            if loop_count >= MAX_RETRY_LOOPS:
-                self._log("Max retries reached — proceeding with partial data")
-                print("[PlannerAgent] Max retries reached — proceeding with partial data.")
-                break
-
-            # In a fully interactive loop (API/WS) the caller would inject new
-            # answers here. In stateless mode we break and surface missing fields.
-            break  # stateless: surface missing fields to caller
-
-        return self.state["validation_result"]
+        # Merge incoming answers with any previously collected ones. Each call
+        # is one collection round; execute_plan_stepwise enforces the cap.
+        self.state.responses.update(answers)
+        self.state.retry_count += 1
+        attempt = self.state.retry_count
+
+        self._log("Data-collection loop started", detail=f"retry #{attempt}")
+
+        validation = self._run_validation(self.state.responses)
+        self.state.validation_result = validation
+        self.state.missing_fields    = validation.get("missing_fields", [])
+
+        if validation["is_valid"]:
+            self.state.status = "validation_passed"
+            self._log("Validation passed", detail=f"round {attempt}")
+            logger.debug("Data complete — exiting collection loop")
+            return validation
+
+        # Data incomplete — the caller surfaces missing fields for another round
+        self.state.status = "needs_more_data"
+        self._log(
+            "Data incomplete — requesting missing fields",
+            detail=str(validation["missing_fields"]),
+        )
+        logger.info(
+            "Missing fields: %s (round %d/%d)",
+            validation["missing_fields"], attempt, MAX_RETRY_LOOPS,
+        )
+        return validation
 
     # =========================================================================
     # STEP 11 — Clinical Compliance Validation
@@ -384,7 +545,8 @@ class PlannerAgent:
         flags = []
 
         treatment = decision.get("treatment_type", "")
-        if not treatment or treatment.strip().lower() in ("", "unknown", "tbd"):
+        treatment_lower = treatment.lower()
+        if treatment_lower.strip() in _UNDEFINED_TREATMENTS:
             flags.append("Treatment type is undefined — clinical review required.")
 
         required_reports = decision.get("required_reports", [])
@@ -392,10 +554,7 @@ class PlannerAgent:
             flags.append("No required diagnostic reports specified.")
 
         surgery_allowed = decision.get("surgery_allowed", True)
-        treatment_lower = treatment.lower()
-        surgical_keywords = ["surgery", "surgical", "mastectomy", "lumpectomy",
-                             "cabg", "resection", "amputation"]
-        if not surgery_allowed and any(k in treatment_lower for k in surgical_keywords):
+        if not surgery_allowed and _COMPLIANCE_SURGICAL_RE.search(treatment_lower):
             flags.append(
                 "Recommended treatment includes surgery, but patient opted out — "
                 "clinical override needed."
@@ -404,17 +563,17 @@ class PlannerAgent:
         compliant = len(flags) == 0
 
         if not compliant:
-            self.state["compliance_status"]      = "flagged"
-            self.state["manual_review_flagged"]  = True
+            self.state.compliance_status      = "flagged"
+            self.state.manual_review_flagged  = True
             self._log("Clinical compliance FAILED — flagged for manual review",
                       detail=str(flags))
-            print(f"[PlannerAgent] ⚠️  Compliance flags: {flags}")
+            logger.warning("Compliance flags: %s", flags)
             action = "flag_for_manual_review"
         else:
-            self.state["compliance_status"]     = "compliant"
-            self.state["manual_review_flagged"] = False
+            self.state.compliance_status     = "compliant"
+            self.state.manual_review_flagged = False
             self._log("Clinical compliance passed")
-            print("[PlannerAgent] ✅ Recommendations are clinically compliant.")
+            logger.debug("Recommendations are clinically compliant")
             action = "proceed"
 
         return {"compliant": compliant, "flags": flags, "action": action}
@@ -433,7 +592,7 @@ class PlannerAgent:
             f"Flags: {'; '.join(flags)}"
         )
         self._log("Manual review flag raised", detail=notice)
-        print(f"[PlannerAgent] Manual review flag raised. Provider notification logged.")
+        logger.warning("Manual review flag raised; provider notification logged")
         return {
             "manual_review": True,
             "notice": notice,
@@ -448,33 +607,20 @@ class PlannerAgent:
         Schedule follow-up reminders based on treatment timeline (Step 19).
         Returns a list of reminder dicts.
         """
-        now = datetime.datetime.utcnow()
+        today = datetime.datetime.now(datetime.timezone.utc).date()
+        values = {"disease_type": disease_type, "timeline": timeline or "as prescribed"}
         reminders = [
             {
-                "reminder_id": str(uuid.uuid4())[:8],
-                "type": "Initial Consultation",
-                "message": f"Schedule your first specialist appointment for {disease_type}.",
-                "due_date": (now + datetime.timedelta(days=7)).strftime("%Y-%m-%d"),
-            },
-            {
-                "reminder_id": str(uuid.uuid4())[:8],
-                "type": "Diagnostic Reports",
-                "message": "Collect all required diagnostic reports before your appointment.",
-                "due_date": (now + datetime.timedelta(days=14)).strftime("%Y-%m-%d"),
-            },
-            {
-                "reminder_id": str(uuid.uuid4())[:8],
-                "type": "Treatment Follow-up",
-                "message": (
-                    f"Follow-up with your specialist regarding treatment progress. "
-                    f"Expected timeline: {timeline or 'as prescribed'}."
-                ),
-                "due_date": (now + datetime.timedelta(days=30)).strftime("%Y-%m-%d"),
-            },
+                "reminder_id": uuid.uuid4().hex[:8],
+                "type": kind,
+                "message": message.format_map(values),
+                "due_date": (today + datetime.timedelta(days=days)).isoformat(),
+            }
+            for kind, days, message in _REMINDER_SPECS
         ]
-        self.state["followups"] = reminders
+        self.state.followups = reminders
         self._log("Follow-up reminders scheduled", detail=f"{len(reminders)} reminders")
-        print(f"[PlannerAgent] {len(reminders)} follow-up reminders scheduled.")
+        logger.debug("%d follow-up reminders scheduled", len(reminders))
         return reminders
 
     # =========================================================================
@@ -487,12 +633,13 @@ class PlannerAgent:
         """
         self._log(
             "Execution complete — audit trail finalised",
-            detail=f"session_id={self.state.get('session_id')} | "
-                   f"status={self.state['status']} | "
-                   f"compliance={self.state['compliance_status']}",
+            detail=f"session_id={self.state.session_id} | "
+                   f"status={self.state.status} | "
+                   f"compliance={self.state.compliance_status}",
         )
-        print(f"[PlannerAgent] Audit trail has {len(self.state['audit_trail'])} entries.")
-        return self.state["audit_trail"]
+        self._flush_audit()
+        logger.debug("Audit trail has %d entries", len(self.state.audit_trail))
+        return list(self.state.audit_trail)
 
     # =========================================================================
     # STEP 21 — End Session
@@ -501,15 +648,16 @@ class PlannerAgent:
         """
         Gracefully end the session and mark state as closed (Step 21).
         """
-        self.state["session_ended"] = True
-        self.state["status"]        = "session_ended"
+        self.state.session_ended = True
+        self.state.status        = "session_ended"
         self._log("Session ended gracefully",
-                  detail=f"session_id={self.state.get('session_id')}")
-        print(f"[PlannerAgent] Session ended. session_id={self.state.get('session_id')}")
+                  detail=f"session_id={self.state.session_id}")
+        self._flush_audit()
+        logger.info("Session ended: session_id=%s", self.state.session_id)
         return {
-            "session_id": self.state.get("session_id"),
+            "session_id": self.state.session_id,
             "status": "session_ended",
-            "audit_entries": len(self.state["audit_trail"]),
+            "audit_entries": len(self.state.audit_trail),
         }
 
     # =========================================================================
@@ -538,13 +686,13 @@ class PlannerAgent:
           20 → log_audit_trail
           21 → end_session (state only; caller controls HTTP lifecycle)
         """
-        print("[PlannerAgent] ▶ Starting STRICT stepwise plan execution…")
-        self.state["status"] = "executing"
+        logger.debug("Starting strict stepwise plan execution")
+        self.state.status = "executing"
 
         # ── Step 2: Authentication ────────────────────────────────────────────
         auth_result = self.check_authentication(
-            user_id    = self.state.get("user_id"),
-            session_id = self.state.get("session_id"),
+            user_id    = self.state.user_id,
+            session_id = self.state.session_id,
             authenticated=True,  # In direct/API mode the caller is already trusted
         )
         if not auth_result["authenticated"]:
@@ -564,7 +712,7 @@ class PlannerAgent:
         # ── Step 8–10: Strict Data-Collection Loop ───────────────────────────
         validation = self.loop_until_data_complete(answers)
 
-        if not validation.get("is_valid") and self.state["retry_count"] <= MAX_RETRY_LOOPS:
+        if not validation.get("is_valid") and self.state.retry_count <= MAX_RETRY_LOOPS:
             # Surface missing fields to the caller for another round of answers
             return {
                 "status": "needs_more_data",
@@ -575,89 +723,38 @@ class PlannerAgent:
                     + ", ".join(validation.get("missing_fields", []))
                 ),
             }
-
-        # ── Step 11a: Build profile & constraint dicts ───────────────────────
-        responses = self.state["responses"]
-        profile = {
-            "disease_type":    responses.get("disease_type", ""),
-            "cancer_type":     responses.get("cancer_type", responses.get("disease_type", "")),
-            "stage":           responses.get("stage", ""),
-            "medical_history": responses.get("medical_history", ""),
-            "surgery_allowed": self._parse_bool(responses.get("surgery_allowed", "yes")),
-            "age":             responses.get("age", ""),
-            "gender":          responses.get("gender", ""),
-            "symptoms":        responses.get("symptoms", ""),
-        }
-        constraint = {
-            "budget_limit":        responses.get("budget_limit"),
-            "location_type":       responses.get("location_type", "national"),
-            "hospital_preference": responses.get("hospital_preference", "private"),
-        }
-        self.state["profile"]    = profile
-        self.state["constraint"] = constraint
-
-        # ── Step 11b: DecisionEngine ─────────────────────────────────────────
-        print("[PlannerAgent] → DecisionEngine analysing profile…")
-        self._log("DecisionEngine triggered")
-        decision = self._decision_engine.analyze(profile, constraint)
-        self.state["decision"] = decision
-
-        # ── Step 12: Clinical Compliance Validation ───────────────────────────
-        compliance = self.validate_clinical_compliance(decision)
-        if not compliance["compliant"]:
-            review_notice = self.flag_for_manual_review(compliance["flags"])
-            # Attach notice to decision notes so it surfaces in the output
-            decision["notes"] = (
-                (decision.get("notes") or "") + " | " + review_notice["notice"]
-            ).strip(" |")
-
-        # ── Step 14–16: RecommendationEngine ─────────────────────────────────
-        print("[PlannerAgent] → RecommendationEngine generating plan…")
-        self._log("RecommendationEngine triggered")
-        recommendation = self._recommendation_engine.generate_plan(decision)
-        self.state["recommendation"] = recommendation
-
-        # ── Step 17: ExplanationEngine ────────────────────────────────────────
-        print("[PlannerAgent] → ExplanationEngine compiling output…")
-        self._log("ExplanationEngine triggered")
-        final_output = self._explanation_engine.generate(
-            profile         = profile,
-            plan_data       = recommendation["treatment_plan"],
-            ranked_hospitals= recommendation["ranked_hospitals"],
-            llm_reasoning   = decision.get("llm_reasoning", ""),
-        )
-
-        # Inject compliance status into the output
-        final_output["compliance_status"] = compliance["compliant"]
-        if self.state["manual_review_flagged"]:
-            final_output["manual_review_required"] = True
-            final_output["compliance_flags"]       = compliance["flags"]
-
-        self.state["final_output"] = final_output
-        self.state["status"]       = "completed"
+        if not validation.get("is_valid"):
+            # Retries exhausted — continue with partial data
+            self._log("Max retries reached — proceeding with partial data")
+            logger.info("Max retries reached — proceeding with partial data")
+
+        # ── Step 11–17: Analysis, served from cache for repeat submissions ───
+        cache_key    = _response_key(self.goal, self.state.responses)
+        final_output = self._cached_analysis(cache_key)
+        if final_output is None:
+            final_output = self._analyse(self.state.responses)
+            # Fallback plans (Gemini / ChromaDB down) are recomputed next time
+            if (self.state.compliance_status == "compliant"
+                    and not self.state.decision.get("degraded")):
+                self._remember_analysis(cache_key, final_output)
+        recommendation = self.state.recommendation
+        profile        = self.state.profile
+
+        self.state.final_output = final_output
+        self.state.status       = "completed"
 
         # ── Step 18: Output →  ────────────────────────────────────────────────
-        print("[PlannerAgent] ✅ Structured JSON output prepared.")
+        logger.debug("Structured JSON output prepared")
 
-        # ── Step 19: Follow-up Reminders ─────────────────────────────────────
-        followups = self.schedule_followups(
-            disease_type = profile.get("disease_type", ""),
-            timeline     = recommendation["treatment_plan"].get("timeline", ""),
+        # ── Step 19–20: Follow-up Reminders + Audit Logging ──────────────────
+        self._attach_followups_and_audit(
+            final_output, profile, recommendation, self.state.session_id
         )
-        final_output["followup_reminders"] = followups
-
-        # ── Step 20: Audit Logging ────────────────────────────────────────────
-        audit = self.log_audit_trail(final_output)
-        final_output["audit_summary"] = {
-            "total_steps_logged": len(audit),
-            "session_id":         self.state.get("session_id"),
-            "timestamp":          datetime.datetime.utcnow().isoformat() + "Z",
-        }
 
         # ── Step 21: End Session ──────────────────────────────────────────────
         self.end_session()
 
-        print("[PlannerAgent] 🏁 Strict stepwise execution complete.")
+        logger.info("Stepwise execution complete")
         return final_output
 
     # =========================================================================
@@ -668,20 +765,30 @@ class PlannerAgent:
         """
         Synchronous plan execution (no DB).
         Delegates to execute_plan_stepwise() — full process-flow compliance.
-        Preserved for Streamlit direct-mode calls.
+        Preserved for Streamlit direct-mode calls. Coroutines must use
+        executePlanAsync instead, as this blocks on Gemini / ChromaDB calls.
         """
         return self.execute_plan_stepwise(answers)
 
+    async def executePlanAsync(self, answers: dict) -> dict:
+        """
+        executePlan for async callers (no DB).
+
+        Runs the stepwise pipeline in a worker thread so the event loop keeps
+        serving other requests while the engines work.
+        """
+        return await asyncio.to_thread(self.execute_plan_stepwise, answers)
+
     def updatePlan(self, answers: dict) -> dict:
         """
         Update plan with new answers and re-validate.
         Used in loop-back scenarios from the Streamlit UI.
         """
-        self.state["responses"].update(answers)
-        self.state["retry_count"] += 1
+        self.state.responses.update(answers)
+        self.state.retry_count += 1
         self._log("Plan updated with new answers",
-                  detail=f"retry #{self.state['retry_count']}")
-        print(f"[PlannerAgent] Plan updated (retry #{self.state['retry_count']}).")
+                  detail=f"retry #{self.state.retry_count}")
+        logger.debug("Plan updated (retry #%d)", self.state.retry_count)
         return self._validate_responses()
 
     async def executePlanWithDB(
@@ -696,18 +803,18 @@ class PlannerAgent:
         Used by the FastAPI /api/plan/respond route.
         Follows the same strict process-flow, but persists profile & plan to DB.
         """
-        print("[PlannerAgent] ▶ Starting async DB-backed plan execution…")
+        logger.debug("Starting async DB-backed plan execution")
 
         # ── Auth + Identity (trusting FastAPI-gated request) ──────────────────
         self.check_authentication(user_id=user_id, session_id=session_id, authenticated=True)
         self.verify_identity()
         self.generate_access_token()
 
-        self.state["responses"] = answers
+        self.state.responses = answers
 
         # ── Strict validation loop ─────────────────────────────────────────────
         validation = self._validate_responses()
-        if not validation["is_valid"] and self.state["retry_count"] < MAX_RETRY_LOOPS:
+        if not validation["is_valid"] and self.state.retry_count < MAX_RETRY_LOOPS:
             self._log("Validation failed — needs more data (DB mode)")
             return {
                 "status":         "needs_more_data",
@@ -718,49 +825,31 @@ class PlannerAgent:
 
         # ── Store MedicalProfile in DB ─────────────────────────────────────────
         self._log("Storing medical profile in PostgreSQL")
-        profile_orm = await self._medical_data_service.store_profile(db, user_id, answers)
+        profile_orm, _c = await self._medical_data_service.store_profile(db, user_id, answers)
         profile_id  = str(profile_orm.profile_id)
 
         # Build profile + constraint dicts
-        profile = {
-            "disease_type":    profile_orm.disease_type or "",
-            "stage":           profile_orm.stage or "",
-            "medical_history": profile_orm.medical_history or "",
-            "surgery_allowed": profile_orm.surgery_allowed,
-            "age":             profile_orm.age,
-            "gender":          profile_orm.gender or "",
-            "symptoms":        profile_orm.symptoms or "",
-        }
+        profile = {k: getattr(profile_orm, k) or "" for k in _PROFILE_TEXT_FIELDS}
+        profile["surgery_allowed"] = profile_orm.surgery_allowed
+        profile["age"]             = profile_orm.age
 
-        # Explicitly query Constraint (async sessions forbid lazy-loading)
-        from sqlalchemy import select as _sa_select
-        from backend.db.models import Constraint as _Constraint
-        _c_res = await db.execute(
-            _sa_select(_Constraint).where(
-                _Constraint.profile_id == profile_orm.profile_id
-            )
-        )
-        _c = _c_res.scalar_one_or_none()
+        # Constraint row comes back from store_profile's INSERT ... RETURNING
         if _c:
-            constraint = {
-                "budget_limit":        _c.budget_limit,
-                "location_type":       _c.location_type or "national",
-                "hospital_preference": _c.hospital_preference or "private",
-            }
+            constraint = {k: getattr(_c, k) or d for k, d in _CONSTRAINT_DEFAULTS.items()}
+            constraint["budget_limit"] = _c.budget_limit  # keep 0 distinct from unset
         else:
-            constraint = {
-                "budget_limit":        self._medical_data_service._parse_budget(
-                                           answers.get("budget_limit")),
-                "location_type":       answers.get("location_type", "national"),
-                "hospital_preference": answers.get("hospital_preference", "private"),
-            }
+            constraint = _constraint_from(answers)
+            constraint["budget_limit"] = self._medical_data_service._parse_budget(
+                constraint["budget_limit"]
+            )
 
-        self.state["profile"]    = profile
-        self.state["constraint"] = constraint
+        self.state.profile    = profile
+        self.state.constraint = constraint
 
         # ── DecisionEngine ────────────────────────────────────────────────────
         self._log("DecisionEngine triggered (DB mode)")
-        decision = self._decision_engine.analyze(profile, constraint)
+        decision = await self._decision_engine.aanalyze(profile, constraint)
+        self.state.decision = decision
 
         # ── Clinical Compliance ───────────────────────────────────────────────
         compliance = self.validate_clinical_compliance(decision)
@@ -773,19 +862,23 @@ class PlannerAgent:
         # ── RecommendationEngine ──────────────────────────────────────────────
         self._log("RecommendationEngine triggered (DB mode)")
         recommendation = self._recommendation_engine.generate_plan(decision)
+        self.state.recommendation = recommendation
 
         # ── ExplanationEngine ─────────────────────────────────────────────────
         self._log("ExplanationEngine triggered (DB mode)")
-        final_output = self._explanation_engine.generate(
+        # Worker thread: the Gemini explanation call must not stall the loop
+        final_output = await asyncio.to_thread(
+            self._explanation_engine.generate,
             profile          = profile,
             plan_data        = recommendation["treatment_plan"],
             ranked_hospitals = recommendation["ranked_hospitals"],
             llm_reasoning    = decision.get("llm_reasoning", ""),
+            explanation      = decision.get("llm_explanation"),
         )
 
         # Inject compliance + manual review info
         final_output["compliance_status"] = compliance["compliant"]
-        if self.state["manual_review_flagged"]:
+        if self.state.manual_review_flagged:
             final_output["manual_review_required"] = True
             final_output["compliance_flags"]       = compliance["flags"]
 
@@ -800,53 +893,45 @@ class PlannerAgent:
         )
 
         # ── Follow-ups + Audit ────────────────────────────────────────────────
-        followups = self.schedule_followups(
-            disease_type = profile.get("disease_type", ""),
-            timeline     = recommendation["treatment_plan"].get("timeline", ""),
+        self._attach_followups_and_audit(
+            final_output, profile, recommendation, session_id
         )
-        final_output["followup_reminders"] = followups
-
-        audit = self.log_audit_trail(final_output)
-        final_output["audit_summary"] = {
-            "total_steps_logged": len(audit),
-            "session_id":         session_id,
-            "timestamp":          datetime.datetime.utcnow().isoformat() + "Z",
-        }
 
         # ── Close DB session ──────────────────────────────────────────────────
         if session_id:
             await self._medical_data_service.end_session(db, session_id)
 
-        self.state["final_output"] = final_output
-        self.state["status"]       = "completed"
+        self.state.final_output = final_output
+        self.state.status       = "completed"
         self.end_session()
 
-        print("[PlannerAgent] 🏁 Async DB-backed execution complete.")
+        logger.info("Async DB-backed execution complete")
         return final_output
 
     # =========================================================================
     # Utility / Introspection
     # =========================================================================
 
-    def get_state(self) -> dict:
+    def get_state(self) -> PlannerState:
         """Return current planner state (for debugging/monitoring)."""
+        self._flush_audit()
         return self.state
 
     def get_audit_trail(self) -> list[dict]:
-        """Return the full audit trail for this session."""
-        return self.state["audit_trail"]
+        """Return the audit trail for this session (latest AUDIT_TRAIL_MAXLEN entries)."""
+        self._flush_audit()
+        return list(self.state.audit_trail)
 
     def get_followups(self) -> list[dict]:
         """Return the scheduled follow-up reminders."""
-        return self.state.get("followups", [])
+        return self.state.followups
 
     def get_missing_questions(self) -> list[dict]:
         """Return only the questions for missing fields (for loop-back UI)."""
-        missing      = self.state.get("missing_fields", [])
-        all_questions = self.state.get("questions", [])
+        missing = set(self.state.missing_fields)
         if not missing:
             return []
-        return [q for q in all_questions if q.get("field") in missing]
+        return [q for q in self.state.questions if q.get("field") in missing]
 
     # =========================================================================
     # Private Helpers
@@ -854,25 +939,149 @@ class PlannerAgent:
 
     def _validate_responses(self) -> dict:
         """Internal: run ValidationEngine on current state responses."""
-        validation = self._validation_engine.validate_from_responses(
-            self.state["responses"]
-        )
-        self.state["validation_result"] = validation
-        self.state["missing_fields"]    = validation.get("missing_fields", [])
-        self.state["status"] = (
+        validation = self._run_validation(self.state.responses)
+        self.state.validation_result = validation
+        self.state.missing_fields    = validation.get("missing_fields", [])
+        self.state.status = (
             "validation_passed" if validation["is_valid"] else "validation_failed"
         )
         return validation
 
+    def _run_validation(self, responses: dict) -> dict:
+        """Validate ``responses``, reusing a cached result for answers seen before."""
+        # repr() keeps unhashable answer values (lists, dicts) cacheable
+        key = frozenset((k, repr(v)) for k, v in responses.items())
+        cache = self._validation_cache
+        validation = cache.get(key)
+        if validation is not None:
+            cache.move_to_end(key)
+            return validation
+
+        validation = self._validation_engine.validate_from_responses(responses)
+        cache[key] = validation
+        if len(cache) > VALIDATION_CACHE_SIZE:
+            cache.popitem(last=False)
+        return validation
+
+    def _analyse(self, responses: dict) -> dict:
+        """Steps 11–17: profile build, decision, compliance, plan, explanation."""
+        # ── Step 11a: Build profile & constraint dicts ───────────────────────
+        profile = {k: responses.get(k, d) for k, d in _PROFILE_SPEC}
+        profile["cancer_type"]     = responses.get("cancer_type", profile["disease_type"])
+        profile["surgery_allowed"] = self._parse_bool(responses.get("surgery_allowed", "yes"))
+        constraint = _constraint_from(responses)
+        self.state.profile    = profile
+        self.state.constraint = constraint
+
+        # ── Step 11b: DecisionEngine ─────────────────────────────────────────
+        logger.debug("DecisionEngine analysing profile")
+        self._log("DecisionEngine triggered")
+        decision = self._decision_engine.analyze(profile, constraint)
+        self.state.decision = decision
+
+        # ── Step 12: Clinical Compliance Validation ───────────────────────────
+        compliance = self.validate_clinical_compliance(decision)
+        if not compliance["compliant"]:
+            review_notice = self.flag_for_manual_review(compliance["flags"])
+            # Attach notice to decision notes so it surfaces in the output
+            decision["notes"] = (
+                (decision.get("notes") or "") + " | " + review_notice["notice"]
+            ).strip(" |")
+
+        # ── Step 14–16: RecommendationEngine ─────────────────────────────────
+        logger.debug("RecommendationEngine generating plan")
+        self._log("RecommendationEngine triggered")
+        recommendation = self._recommendation_engine.generate_plan(decision)
+        self.state.recommendation = recommendation
+
+        # ── Step 17: ExplanationEngine ────────────────────────────────────────
+        logger.debug("ExplanationEngine compiling output")
+        self._log("ExplanationEngine triggered")
+        final_output = self._explanation_engine.generate(
+            profile         = profile,
+            plan_data       = recommendation["treatment_plan"],
+            ranked_hospitals= recommendation["ranked_hospitals"],
+            llm_reasoning   = decision.get("llm_reasoning", ""),
+            explanation     = decision.get("llm_explanation"),
+        )
+
+        # Inject compliance status into the output
+        final_output["compliance_status"] = compliance["compliant"]
+        if self.state.manual_review_flagged:
+            final_output["manual_review_required"] = True
+            final_output["compliance_flags"]       = compliance["flags"]
+
+        return final_output
+
+    def _cached_analysis(self, key: str) -> Optional[dict]:
+        """Restore steps 11–17 from the response cache; None on a miss."""
+        with _response_lock:
+            cached = _RESPONSE_CACHE.get(key)
+        if cached is None:
+            return None
+        (self.state.profile, self.state.constraint, self.state.decision,
+         self.state.recommendation, final_output) = copy.deepcopy(cached)
+        self.state.compliance_status     = "compliant"
+        self.state.manual_review_flagged = False
+        self._log("Plan served from response cache")
+        logger.debug("Response cache hit")
+        return final_output
+
+    def _remember_analysis(self, key: str, final_output: dict) -> None:
+        """Cache a compliant analysis before later steps annotate the output."""
+        snapshot = copy.deepcopy((
+            self.state.profile, self.state.constraint, self.state.decision,
+            self.state.recommendation, final_output,
+        ))
+        with _response_lock:
+            _RESPONSE_CACHE[key] = snapshot
+
+    def _attach_followups_and_audit(self, final_output: dict, profile: dict,
+                                    recommendation: dict, session_id: Optional[str]) -> None:
+        """
+        Steps 19–20: add follow-up reminders and the audit summary to the output.
+
+        Either step can be switched off via FOLLOWUPS_ENABLED /
+        AUDIT_TRAIL_ENABLED; the output keys are then still present, empty.
+        """
+        if FOLLOWUPS_ENABLED:
+            final_output["followup_reminders"] = self.schedule_followups(
+                disease_type = profile.get("disease_type", ""),
+                timeline     = recommendation["treatment_plan"].get("timeline", ""),
+            )
+        else:
+            final_output["followup_reminders"] = []
+
+        if AUDIT_TRAIL_ENABLED:
+            audit = self.log_audit_trail(final_output)
+            final_output["audit_summary"] = {
+                "total_steps_logged": len(audit),
+                "session_id":         session_id,
+                "timestamp":          _utc_iso(),
+            }
+        else:
+            final_output["audit_summary"] = {"total_steps_logged": 0, "disabled": True}
+
     def _log(self, step: str, detail: str = "") -> None:
-        """Append a timestamped audit entry to the internal trail."""
-        entry = {
-            "timestamp": datetime.datetime.utcnow().isoformat() + "Z",
-            "step":      step,
-            "status":    self.state.get("status", "unknown"),
-            "detail":    detail,
-        }
-        self.state["audit_trail"].append(entry)
+        """Buffer a timestamped audit entry; formatting is deferred to _flush_audit."""
+        self._audit_buffer.append(
+            (time.time(), step, self.state.status, detail)
+        )
+
+    def _flush_audit(self) -> None:
+        """Move buffered audit entries into state.audit_trail in one batch."""
+        if not self._audit_buffer:
+            return
+        self.state.audit_trail.extend(
+            {
+                "timestamp": _utc_iso(ts),
+                "step":      step,
+                "status":    status,
+                "detail":    detail,
+            }
+            for ts, step, status, detail in self._audit_buffer
+        )
+        self._audit_buffer.clear()
 
     @staticmethod
     def _parse_bool(value) -> bool:
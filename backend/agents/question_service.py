@@ -7,16 +7,24 @@ Responsibilities:
 - Ensure necessary data fields are captured
 """
 import json
+import logging
 import re
-import google.generativeai as genai
-from backend.config import GEMINI_API_KEY
-
-genai.configure(api_key=GEMINI_API_KEY)
-_model = genai.GenerativeModel("gemini-1.5-flash")
-
-
-# Default questions for fallback when LLM is unavailable
-DEFAULT_QUESTIONS = [
+from types import MappingProxyType
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+from backend.agents._llm import (
+    get_model, make_cache_key, cached_generate, JSON_RESPONSE_CONFIG,
+)
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+# Default questions for fallback when LLM is unavailable; read-only, callers
+# get fresh dict copies from generate_questions
+DEFAULT_QUESTIONS = tuple(MappingProxyType(q) for q in [
     {"field": "disease_type", "question": "What type of disease or medical condition are you dealing with?", "required": True},
     {"field": "stage", "question": "What is the current stage or severity of the condition (if known)?", "required": True},
     {"field": "age", "question": "What is the patient's age?", "required": True},
@@ -27,27 +35,10 @@ DEFAULT_QUESTIONS = [
     {"field": "budget_limit", "question": "What is the approximate budget for treatment (in INR)? E.g., 200000 for 2 lakhs", "required": True},
     {"field": "location_type", "question": "Do you prefer a local, national, or international hospital?", "required": True},
     {"field": "hospital_preference", "question": "Do you prefer a government or private hospital?", "required": False},
-]
-
-
-class QuestionService:
-    """
-    Generates medical questions using Gemini LLM based on the user goal.
-    Falls back to default questions if the LLM is unavailable.
-    """
-
-    def generate_questions(self, goal: str) -> list[dict]:
-        """
-        Generate a list of medical questions based on the user's healthcare goal.
-
-        Args:
-            goal: The user's stated healthcare goal (e.g., "I want treatment for breast cancer")
+])
 
-        Returns:
-            List of dicts with keys: field, question, required
-        """
-        try:
-            prompt = f"""
+# Question-generation prompt; {goal} is filled in per request
+_QUESTIONS_PROMPT = """
 You are a healthcare data collection assistant. Based on the following patient goal:
 
 "{goal}"
@@ -66,22 +57,67 @@ Return ONLY a valid JSON array with this exact format:
 Include questions about: disease type, stage/severity, age, gender, medical history, symptoms, surgery preference, budget, and location preference.
 Do not include any explanatory text, only the JSON array.
 """
-            response = _model.generate_content(prompt)
-            raw = response.text.strip()
 
-            # Extract JSON array from response
-            json_match = re.search(r'\[.*\]', raw, re.DOTALL)
-            if json_match:
-                questions = json.loads(json_match.group())
-                if isinstance(questions, list) and len(questions) > 0:
-                    print(f"[QuestionService] Generated {len(questions)} questions via Gemini.")
-                    return questions
+
+# Outermost JSON array in the reply; only needed if Gemini ignores JSON mode
+# and wraps the array in prose or fences
+_JSON_ARRAY_RE = re.compile(r"\[.*\]", re.DOTALL)
+
+
+def _loads(text: str):
+    """Decode JSON with orjson when available, else the stdlib."""
+    return orjson.loads(text) if orjson is not None else json.loads(text)
+
+
+def _parse_questions(raw: str) -> list[dict]:
+    """Parse the question array from Gemini's reply; raise if there is none."""
+    try:
+        questions = _loads(raw)
+    except ValueError:
+        json_match = _JSON_ARRAY_RE.search(raw)
+        if not json_match:
+            raise ValueError("no JSON array in Gemini response") from None
+        questions = _loads(json_match.group())
+    if not isinstance(questions, list) or not questions:
+        raise ValueError("Gemini returned an empty question list")
+    return questions
+
+
+class QuestionService:
+    """
+    Generates medical questions using Gemini LLM based on the user goal.
+    Falls back to default questions if the LLM is unavailable.
+    """
+
+    def generate_questions(self, goal: str) -> list[dict]:
+        """
+        Generate a list of medical questions based on the user's healthcare goal.
+
+        Gemini output is cached per normalised goal, so repeat intents such as
+        "breast cancer treatment" skip the API call. Failures are not cached.
+
+        Args:
+            goal: The user's stated healthcare goal (e.g., "I want treatment for breast cancer")
+
+        Returns:
+            List of dicts with keys: field, question, required
+        """
+        try:
+            questions = cached_generate(
+                get_model(),
+                _QUESTIONS_PROMPT.format(goal=goal),
+                make_cache_key("questions", goal),
+                parse=_parse_questions,
+                generation_config=JSON_RESPONSE_CONFIG,
+            )
+            logger.debug("Generated %d questions via Gemini", len(questions))
+            # Hand out copies so callers cannot mutate the cached entries
+            return [dict(q) for q in questions]
 
         except Exception as e:
-            print(f"[QuestionService] Gemini error, using defaults: {e}")
+            logger.warning("Gemini error, using default questions: %s", e)
 
-        print(f"[QuestionService] Using {len(DEFAULT_QUESTIONS)} default questions.")
-        return DEFAULT_QUESTIONS
+        return [dict(q) for q in DEFAULT_QUESTIONS]
 
     def collect_responses(self, questions: list[dict], answers: dict) -> dict:
         """
@@ -94,10 +130,12 @@ Do not include any explanatory text, only the JSON array.
         Returns:
             Dict of field -> answer mappings
         """
-        collected = {}
-        for q in questions:
-            field = q.get("field", "")
-            if field and field in answers:
-                collected[field] = answers[field]
-        print(f"[QuestionService] Collected {len(collected)} responses.")
+        # Iterate the questions (not a set) so the output keeps question order,
+        # which is what raw_output and the UI display
+        collected = {
+            field: answers[field]
+            for q in questions
+            if (field := q.get("field")) and field in answers
+        }
+        logger.debug("Collected %d responses", len(collected))
         return collected
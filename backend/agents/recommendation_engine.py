@@ -7,9 +7,48 @@ Responsibilities:
 - Create prioritized hospital recommendation list
 - Persist TreatmentPlan and Recommendations to PostgreSQL
 """
+import functools
+import logging
+from operator import itemgetter
 from sqlalchemy.ext.asyncio import AsyncSession
 from backend.db.models import TreatmentPlan, Recommendation, Hospital
-from sqlalchemy import select
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Accreditation bit flags and the score bonus indexed by them:
+# JCI +1.0, NABH +0.5, both +1.5
+ACCR_JCI = 1
+ACCR_NABH = 2
+_ACCREDITATION_BONUS = (0.0, 1.0, 0.5, 1.5)
+
+
+@functools.lru_cache(maxsize=64)
+def accreditation_flags(accreditation: str) -> int:
+    """
+    Encode the accreditations the ranking cares about as a small bitset.
+
+    Memoised per accreditation string (the catalogue only has a handful),
+    so the substring tests run once per distinct value, not per hospital.
+    """
+    return (ACCR_JCI if "JCI" in accreditation else 0) | (ACCR_NABH if "NABH" in accreditation else 0)
+
+
+def _hospital_score(h: dict, required_type: str) -> float:
+    """Composite score: type match, rating (0-5 scale) and accreditation bonus."""
+    hospital_type = h.get("type")
+    if hospital_type == required_type:
+        score = 3.0
+    elif hospital_type == "Multi-specialty":
+        score = 1.5
+    else:
+        score = 0.0
+
+    score += float(h.get("rating", 3.0))
+
+    return score + _ACCREDITATION_BONUS[accreditation_flags(h.get("accreditation") or "")]
 
 
 class RecommendationEngine:
@@ -43,7 +82,7 @@ class RecommendationEngine:
             decision.get("hospital_type", "Multi-specialty")
         )
 
-        print(f"[RecommendationEngine] Ranked {len(ranked_hospitals)} hospitals.")
+        logger.debug("Ranked %d hospitals", len(ranked_hospitals))
         return {
             "treatment_plan": treatment_plan,
             "ranked_hospitals": ranked_hospitals,
@@ -60,29 +99,12 @@ class RecommendationEngine:
         Returns:
             List of ranked hospital dicts with priority_rank added
         """
-        scored = []
-        for h in hospitals:
-            score = 0.0
-            # Type match bonus
-            if h.get("type") == required_type:
-                score += 3.0
-            elif h.get("type") == "Multi-specialty":
-                score += 1.5
-
-            # Rating score (0-5 scale)
-            score += float(h.get("rating", 3.0))
-
-            # Accreditation bonus
-            accreditation = h.get("accreditation", "")
-            if "JCI" in accreditation:
-                score += 1.0
-            if "NABH" in accreditation:
-                score += 0.5
-
-            scored.append((score, h))
-
-        # Sort by score descending
-        scored.sort(key=lambda x: x[0], reverse=True)
+        # Score each hospital once, then sort on the score alone (stable for ties)
+        scored = sorted(
+            ((_hospital_score(h, required_type), h) for h in hospitals),
+            key=itemgetter(0),
+            reverse=True,
+        )
 
         ranked = []
         for rank, (score, h) in enumerate(scored, start=1):
@@ -112,7 +134,7 @@ class RecommendationEngine:
         Persist the TreatmentPlan and Recommendations to PostgreSQL.
 
         Args:
-            db: Async SQLAlchemy session
+            db: Async SQLAlchemy session with no transaction in progress
             profile_id: The medical profile UUID
             plan_data: The treatment_plan dict
             ranked_hospitals: The ranked hospital list
@@ -126,51 +148,61 @@ class RecommendationEngine:
             "Consult a licensed medical professional before making any healthcare decisions."
         )
 
-        plan = TreatmentPlan(
-            profile_id=profile_id,
-            treatment_type=plan_data.get("treatment_type", ""),
-            timeline=plan_data.get("timeline", ""),
-            disclaimer=disclaimer,
-            notes=plan_data.get("notes", ""),
-            raw_output=raw_output,
-        )
-        db.add(plan)
-        await db.flush()
-
-        # Save hospital records (upsert-style: only if not existing)
-        for h in ranked_hospitals:
-            h_id = h.get("hospital_id")
-            if h_id:
-                result = await db.execute(
-                    select(Hospital).where(Hospital.hospital_id == h_id)
+        # Plan, hospitals and recommendations share one BEGIN ... COMMIT; the
+        # statements go out back to back with no flush/commit round trips between
+        async with db.begin():
+            # RETURNING hands back the full plan row (incl. plan_id), no refresh
+            plan = await db.scalar(
+                insert(TreatmentPlan)
+                .values(
+                    profile_id=profile_id,
+                    treatment_type=plan_data.get("treatment_type", ""),
+                    timeline=plan_data.get("timeline", ""),
+                    disclaimer=disclaimer,
+                    notes=plan_data.get("notes", ""),
+                    raw_output=raw_output,
                 )
-                existing = result.scalar_one_or_none()
-                if not existing:
-                    hospital_record = Hospital(
-                        hospital_id=h_id,
-                        name=h.get("name", ""),
-                        type=h.get("type", ""),
-                        location=h.get("location", ""),
-                        city=h.get("city", ""),
-                        state=h.get("state", ""),
-                        contact=h.get("contact", ""),
-                        accreditation=h.get("accreditation", ""),
-                        rating=h.get("rating"),
-                        budget_category=h.get("budget_category", ""),
-                        accepts_insurance=h.get("accepts_insurance", True),
-                        specializations=h.get("specializations", []),
-                    )
-                    db.add(hospital_record)
-
-                rec = Recommendation(
-                    plan_id=plan.plan_id,
-                    hospital_id=h_id,
-                    priority_rank=int(h.get("priority_rank", 1)),
-                    reasoning=f"Ranked #{h.get('priority_rank')} based on type match and rating.",
+                .returning(TreatmentPlan)
+            )
+
+            # Save hospital records in one INSERT ... ON CONFLICT DO NOTHING;
+            # rows already stored are left untouched
+            hospital_rows = {
+                h["hospital_id"]: {
+                    "hospital_id": h["hospital_id"],
+                    "name": h.get("name", ""),
+                    "type": h.get("type", ""),
+                    "location": h.get("location", ""),
+                    "city": h.get("city", ""),
+                    "state": h.get("state", ""),
+                    "contact": h.get("contact", ""),
+                    "accreditation": h.get("accreditation", ""),
+                    "rating": h.get("rating"),
+                    "budget_category": h.get("budget_category", ""),
+                    "accepts_insurance": h.get("accepts_insurance", True),
+                    "specializations": h.get("specializations", []),
+                }
+                for h in ranked_hospitals if h.get("hospital_id")
+            }
+            if hospital_rows:
+                await db.execute(
+                    pg_insert(Hospital)
+                    .values(list(hospital_rows.values()))
+                    .on_conflict_do_nothing(index_elements=[Hospital.hospital_id])
                 )
-                db.add(rec)
 
-        await db.commit()
-        await db.refresh(plan)
-        print(f"[RecommendationEngine] Plan {plan.plan_id} saved to DB.")
+            # All recommendation rows go out as one executemany batch
+            rec_rows = [
+                {
+                    "plan_id": plan.plan_id,
+                    "hospital_id": h["hospital_id"],
+                    "priority_rank": int(h.get("priority_rank", 1)),
+                    "reasoning": f"Ranked #{h.get('priority_rank')} based on type match and rating.",
+                }
+                for h in ranked_hospitals if h.get("hospital_id")
+            ]
+            if rec_rows:
+                await db.execute(insert(Recommendation), rec_rows)
+
+        logger.debug("Plan %s saved to DB", plan.plan_id)
         return plan
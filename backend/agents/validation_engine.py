@@ -7,6 +7,11 @@ Responsibilities:
 - Verify required reports are mentioned
 - Signal if data is incomplete (so PlannerAgent can loop back to QuestionService)
 """
+import logging
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
 
 # Required fields for a valid MedicalProfile
 REQUIRED_FIELDS = [
@@ -50,21 +55,14 @@ class ValidationEngine:
               - warnings (list of str)
               - errors (list of str)
         """
-        missing_fields = []
         warnings = []
         errors = []
 
-        # ── Profile completeness check ────────────────────────────────────────
-        for field in REQUIRED_FIELDS:
-            value = profile.get(field)
-            if value is None or str(value).strip() == "":
-                missing_fields.append(field)
-
-        # ── Constraint completeness check ─────────────────────────────────────
-        for field in REQUIRED_CONSTRAINT_FIELDS:
-            value = constraint.get(field)
-            if value is None or str(value).strip() == "":
-                missing_fields.append(field)
+        # ── Profile + constraint completeness check ───────────────────────────
+        missing_fields = (
+            self._find_missing(profile, REQUIRED_FIELDS)
+            + self._find_missing(constraint, REQUIRED_CONSTRAINT_FIELDS)
+        )
 
         # ── Constraint logic validation ───────────────────────────────────────
         location_type = str(constraint.get("location_type", "")).lower()
@@ -107,29 +105,31 @@ class ValidationEngine:
         }
 
         if is_valid:
-            print("[ValidationEngine] Profile is valid.")
+            logger.debug("Profile is valid")
         else:
-            print(f"[ValidationEngine] Validation failed. Missing: {missing_fields}, Errors: {errors}")
+            logger.debug("Validation failed. Missing: %s, Errors: %s", missing_fields, errors)
 
         return result
 
+    @staticmethod
+    def _find_missing(data: dict, fields) -> list:
+        """
+        Return the fields in ``fields`` that are absent or blank in ``data``.
+
+        None is checked first so it never goes through str(); False and 0
+        are real answers (e.g. surgery_allowed=False) and count as present.
+        """
+        return [
+            f for f in fields
+            if (v := data.get(f)) is None or not str(v).strip()
+        ]
+
     def validate_from_responses(self, responses: dict) -> dict:
         """
         Convenience method: validate directly from the raw responses dict.
-        Maps responses to profile/constraint format before validating.
+
+        The responses already use the profile/constraint field names and
+        validate() only reads the fields it knows, so the same dict serves
+        as both without building intermediate copies.
         """
-        profile = {
-            "disease_type": responses.get("disease_type"),
-            "stage": responses.get("stage"),
-            "age": responses.get("age"),
-            "gender": responses.get("gender"),
-            "medical_history": responses.get("medical_history"),
-            "symptoms": responses.get("symptoms"),
-            "surgery_allowed": responses.get("surgery_allowed"),
-        }
-        constraint = {
-            "budget_limit": responses.get("budget_limit"),
-            "location_type": responses.get("location_type"),
-            "hospital_preference": responses.get("hospital_preference"),
-        }
-        return self.validate(profile, constraint)
+        return self.validate(responses, responses)
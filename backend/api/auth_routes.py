@@ -7,19 +7,38 @@ Endpoints:
   POST /api/auth/logout   — Revoke token, end session
   GET  /api/auth/me       — Return current user info from token
 """
+import logging
+import re
 import uuid
 from fastapi import APIRouter, Depends, HTTPException, Header
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, field_validator
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from backend.db.database import get_db
 from backend.db.models import User, UserSession
-from backend.auth.token_store import issue_token, validate_token, revoke_token
+from backend.auth.token_store import (
+    TokenStoreUnavailable, aissue_token, avalidate_token, arevoke_token, to_iso,
+)
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
+# Loose shape check (one "@", a dotted domain, no spaces)
+_EMAIL_RE = re.compile(r"[^@\s]+@[^@\s]+\.[^@\s]+")
+
+
+def _normalize_email(value: str) -> str:
+    """Lower-case and strip an email once, at parse time; blank is left to the endpoint."""
+    email = str(value).strip().lower()
+    if email and not _EMAIL_RE.fullmatch(email):
+        raise ValueError("not a valid email address")
+    return email
+
 
 # ── Pydantic Schemas ──────────────────────────────────────────────────────────
 
@@ -29,10 +48,14 @@ class SignupRequest(BaseModel):
     location: str = ""
     budget: Optional[float] = None
 
+    _norm_email = field_validator("email", mode="before")(_normalize_email)
+
 
 class LoginRequest(BaseModel):
     email: str
 
+    _norm_email = field_validator("email", mode="before")(_normalize_email)
+
 
 class AuthResponse(BaseModel):
     user_id: str
@@ -50,15 +73,29 @@ class LogoutRequest(BaseModel):
 # ── Helper: get or create User record ────────────────────────────────────────
 
 async def _get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
-    result = await db.execute(select(User).where(User.email == email.lower().strip()))
-    return result.scalar_one_or_none()
+    # email is unique: stop at the first row rather than checking for extras
+    result = await db.execute(
+        select(User).where(User.email == email).limit(1)
+    )
+    return result.scalars().first()
+
+
+async def _issue_token(user_id: str, session_id: str, email: str) -> str:
+    """Issue a token, turning a token-store outage into a 503."""
+    try:
+        return await aissue_token(user_id=user_id, session_id=session_id, email=email)
+    except TokenStoreUnavailable:
+        raise HTTPException(
+            status_code=503,
+            detail="Sign-in is temporarily unavailable. Please try again shortly.",
+        )
 
 
 async def _create_session_record(db: AsyncSession, user_id: str) -> UserSession:
+    """Stage a new session row; the calling endpoint commits."""
     session = UserSession(user_id=user_id, goal="pending", status="active")
     db.add(session)
-    await db.commit()
-    await db.refresh(session)
+    await db.flush()
     return session
 
 
@@ -71,35 +108,37 @@ async def signup(request: SignupRequest, db: AsyncSession = Depends(get_db)):
     If the email already exists, returns the existing user's credentials
     (idempotent signup — academic-friendly).
     """
-    email = request.email.lower().strip()
+    email = request.email
     if not email or not request.name.strip():
         raise HTTPException(status_code=422, detail="Name and email are required.")
 
-    # Check if user already exists
-    existing = await _get_user_by_email(db, email)
-    if existing:
+    # Insert the user unless the email is taken — one round trip, and the
+    # unique index on users.email settles concurrent signups for the same email
+    result = await db.execute(
+        pg_insert(User)
+        .values(
+            name=request.name.strip(),
+            email=email,
+            location=request.location.strip() if request.location else "",
+            budget=request.budget,
+        )
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User)
+    )
+    user = result.scalar_one_or_none()
+    if user is None:
         raise HTTPException(
             status_code=409,
             detail=f"Email '{email}' is already registered. Please use Login instead."
         )
 
-    # Create new User
-    user = User(
-        name=request.name.strip(),
-        email=email,
-        location=request.location.strip() if request.location else "",
-        budget=request.budget,
-    )
-    db.add(user)
-    await db.commit()
-    await db.refresh(user)
-    print(f"[Auth] New user registered: {user.user_id} ({email})")
-
-    # Create session record
+    # Create session record; user + session land in one commit
     session = await _create_session_record(db, str(user.user_id))
+    await db.commit()
+    logger.info("New user registered: %s", user.user_id)
 
     # Issue token
-    token = issue_token(
+    token = await _issue_token(
         user_id=str(user.user_id),
         session_id=str(session.session_id),
         email=email,
@@ -123,7 +162,7 @@ async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
     Authenticate an existing user by email.
     Returns a fresh access token and starts a new session.
     """
-    email = request.email.lower().strip()
+    email = request.email
     if not email:
         raise HTTPException(status_code=422, detail="Email is required.")
 
@@ -136,14 +175,15 @@ async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
 
     # Create a new session for this login
     session = await _create_session_record(db, str(user.user_id))
+    await db.commit()
 
     # Issue a fresh token
-    token = issue_token(
+    token = await _issue_token(
         user_id=str(user.user_id),
         session_id=str(session.session_id),
         email=email,
     )
-    print(f"[Auth] User logged in: {user.user_id} ({email})")
+    logger.info("User logged in: %s", user.user_id)
 
     return AuthResponse(
         user_id=str(user.user_id),
@@ -162,22 +202,17 @@ async def logout(request: LogoutRequest, db: AsyncSession = Depends(get_db)):
     """
     Revoke the access token and mark the session as ended.
     """
-    payload = validate_token(request.access_token)
+    payload = await avalidate_token(request.access_token)
     if payload:
-        # End the DB session record
-        result = await db.execute(
-            select(UserSession).where(
-                UserSession.session_id == payload["session_id"]
-            )
+        # End the DB session record in a single UPDATE (no SELECT first)
+        await db.execute(
+            update(UserSession)
+            .where(UserSession.session_id == payload["session_id"])
+            .values(end_time=func.now(), status="completed")
         )
-        db_session = result.scalar_one_or_none()
-        if db_session:
-            from datetime import datetime
-            db_session.end_time = datetime.utcnow()
-            db_session.status = "completed"
-            await db.commit()
-
-    revoke_token(request.access_token)
+        await db.commit()
+
+    await arevoke_token(request.access_token)
     return {"message": "Logged out successfully.", "status": "ok"}
 
 
@@ -193,7 +228,7 @@ async def get_me(authorization: Optional[str] = Header(default=None)):
     if authorization and authorization.startswith("Bearer "):
         token = authorization.split(" ", 1)[1]
 
-    payload = validate_token(token)
+    payload = await avalidate_token(token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid or expired token.")
 
@@ -201,6 +236,6 @@ async def get_me(authorization: Optional[str] = Header(default=None)):
         "user_id":    payload["user_id"],
         "session_id": payload["session_id"],
         "email":      payload["email"],
-        "issued_at":  payload["issued_at"],
-        "expires_at": payload["expires_at"],
+        "issued_at":  to_iso(payload["issued_at"]),
+        "expires_at": to_iso(payload["expires_at"]),
     }
@@ -9,15 +9,49 @@ Endpoints:
   GET  /health                 - Health check
 """
 import uuid
+from typing import Any, Optional
+from cachetools import TTLCache
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, EmailStr
 from sqlalchemy.ext.asyncio import AsyncSession
 from backend.db.database import get_db
 
 router = APIRouter()
-# In-memory store for PlannerAgent instances (one per session)
-_planner_sessions = {}  # Store as generic dict to avoid early import
-_plan_results: dict[str, dict] = {}
+
+PLANNER_STORE_MAXSIZE = 10_000
+PLANNER_STORE_TTL_SECONDS = 3600
+# Finished plans are small and re-fetched later (GET /api/plan/{id}); keep a day
+PLAN_RESULTS_TTL_SECONDS = 86_400
+
+
+# ── Session Store ─────────────────────────────────────────────────────────────
+
+class PlannerStore:
+    """
+    Per-session values keyed by session_id, bounded in size and age.
+
+    Abandoned sessions expire after ``ttl`` seconds and the least recently
+    used ones are evicted once ``maxsize`` is reached, so the store no
+    longer grows for the life of the process.
+    """
+
+    def __init__(self, maxsize: int = PLANNER_STORE_MAXSIZE,
+                 ttl: float = PLANNER_STORE_TTL_SECONDS):
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, session_id: str) -> Optional[Any]:
+        return self._cache.get(session_id)
+
+    def put(self, session_id: str, value: Any) -> None:
+        self._cache[session_id] = value
+
+    def evict(self, session_id: str) -> None:
+        self._cache.pop(session_id, None)
+
+
+# PlannerAgent instances and completed results, one per session
+_planner_sessions = PlannerStore()
+_plan_results = PlannerStore(ttl=PLAN_RESULTS_TTL_SECONDS)
 
 
 # ── Pydantic Request/Response Models ─────────────────────────────────────────
@@ -69,16 +103,17 @@ class PlanRespondResponse(BaseModel):
 @router.post("/api/session/start", response_model=SessionStartResponse, tags=["Session"])
 async def start_session(request: SessionStartRequest, db: AsyncSession = Depends(get_db)):
     """Create a new user and session in PostgreSQL."""
-    from backend.agents.medical_data_service import MedicalDataService
-    svc = MedicalDataService()
-    user = await svc.get_or_create_user(
+    from backend.agents._registry import get_medical_data_service
+    svc = get_medical_data_service()
+    # User upsert + session insert share a single commit
+    user, session = await svc.start_session(
         db=db,
         name=request.name,
         email=request.email,
         location=request.location,
-        budget=request.budget
+        budget=request.budget,
+        goal="pending",
     )
-    session = await svc.create_session(db=db, user_id=user.user_id, goal="pending")
     return SessionStartResponse(
         session_id=session.session_id,
         user_id=user.user_id,
@@ -104,7 +139,7 @@ async def start_plan(request: PlanStartRequest):
     questions = planner.generateQuestions()
 
     # Store planner instance by session
-    _planner_sessions[request.session_id] = planner
+    _planner_sessions.put(request.session_id, planner)
 
     return PlanStartResponse(
         session_id=request.session_id,
@@ -145,7 +180,7 @@ async def respond_to_plan(request: PlanRespondRequest, db: AsyncSession = Depend
         )
 
     # Store result
-    _plan_results[request.session_id] = result
+    _plan_results.put(request.session_id, result)
 
     return PlanRespondResponse(
         session_id=request.session_id,
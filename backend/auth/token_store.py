@@ -7,17 +7,140 @@ Design decisions:
 - UUID-based tokens (no JWT library dependency).
 - Tokens expire after TOKEN_TTL_HOURS hours.
 - Thread-safe via a module-level dict (single process; fine for academic use).
-- A background cleanup is NOT needed — stale entries are pruned on access.
+- A background cleanup is NOT needed — a min-heap of expiry times is swept
+  on every issue/validate, so tokens nobody looks up again are still evicted.
+- With REDIS_URL set, tokens live in Redis instead (``SET ... EX``), so every
+  worker process shares them and Redis expires them itself. FastAPI handlers
+  use the ``a*`` coroutines (redis.asyncio) so a Redis round trip never
+  blocks the event loop; the sync functions remain for the Streamlit /
+  PlannerAgent.check_authentication path. Redis errors fail closed: tokens
+  do not validate and new ones cannot be issued (TokenStoreUnavailable).
+- Only the SHA-256 of each token is kept as the key, so a memory dump or a
+  Redis keyspace listing does not reveal usable tokens.
 """
+import functools
+import hashlib
+import heapq
+import json
+import logging
+import time
 import uuid
 import datetime
 from typing import Optional
 
+from backend.config import REDIS_URL
+
+try:  # optional: only needed when REDIS_URL is set
+    import redis
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover - in-memory store only
+    redis = aioredis = None
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
 TOKEN_TTL_HOURS: int = 8
+TOKEN_TTL_SECONDS: int = TOKEN_TTL_HOURS * 3600
 
-# token_str -> {user_id, session_id, email, issued_at, expires_at}
+# Redis key namespace for tokens
+_REDIS_PREFIX = "hca:token:"
+# Bound on connect/read so an unreachable Redis fails fast instead of hanging
+REDIS_TIMEOUT_SECONDS: float = 2.0
+
+# sha256(token) hex -> {user_id, session_id, email, issued_at, expires_at}
+# issued_at / expires_at are Unix timestamps (float seconds)
 _store: dict[str, dict] = {}
 
+# (expires_at, key) min-heap, so expired tokens are found without a scan
+_expiry_heap: list[tuple[float, str]] = []
+
+
+class TokenStoreUnavailable(RuntimeError):
+    """The shared token store could not be reached, so no token was issued."""
+
+
+def _redis_options() -> dict:
+    if redis is None:
+        raise RuntimeError("REDIS_URL is set but the redis package is not installed")
+    return {
+        "decode_responses": True,
+        "socket_timeout": REDIS_TIMEOUT_SECONDS,
+        "socket_connect_timeout": REDIS_TIMEOUT_SECONDS,
+    }
+
+
+@functools.lru_cache(maxsize=1)
+def _redis():
+    """Shared sync Redis client, or None when REDIS_URL is not configured."""
+    if not REDIS_URL:
+        return None
+    return redis.Redis.from_url(REDIS_URL, **_redis_options())
+
+
+@functools.lru_cache(maxsize=1)
+def _aredis():
+    """Shared asyncio Redis client, or None when REDIS_URL is not configured."""
+    if not REDIS_URL:
+        return None
+    return aioredis.Redis.from_url(REDIS_URL, **_redis_options())
+
+
+def _key(token: str) -> str:
+    """Storage key for a token: its SHA-256, never the token itself."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _sweep() -> None:
+    """Drop every in-memory token whose expiry has passed."""
+    now = time.time()
+    while _expiry_heap and _expiry_heap[0][0] < now:
+        _, key = heapq.heappop(_expiry_heap)
+        _store.pop(key, None)
+
+
+def _new_token(user_id: str, session_id: str, email: str) -> tuple[str, dict]:
+    token = f"hca-{uuid.uuid4().hex}"
+    now = time.time()
+    return token, {
+        "user_id":    user_id,
+        "session_id": session_id,
+        "email":      email,
+        "issued_at":  now,
+        "expires_at": now + TOKEN_TTL_SECONDS,
+    }
+
+
+def _store_local(key: str, payload: dict) -> None:
+    _sweep()
+    _store[key] = payload
+    heapq.heappush(_expiry_heap, (payload["expires_at"], key))
+
+
+def _validate_local(key: str) -> Optional[dict]:
+    _sweep()
+    payload = _store.get(key)
+    if not payload:
+        return None
+
+    # Check expiry
+    if time.time() > payload["expires_at"]:
+        # Prune expired token
+        _store.pop(key, None)
+        logger.debug("Token expired and removed")
+        return None
+
+    return payload
+
+
+def _revoke_local(key: str) -> bool:
+    payload = _store.pop(key, None)
+    if payload is not None:
+        logger.debug("Token revoked for user %s", payload.get("user_id", "?"))
+        return True
+    return False
+
+
+# ── Sync API (Streamlit / PlannerAgent) ───────────────────────────────────────
 
 def issue_token(user_id: str, session_id: str, email: str) -> str:
     """
@@ -25,17 +148,22 @@ def issue_token(user_id: str, session_id: str, email: str) -> str:
 
     Returns:
         The token string (format: hca-<uuid_hex>)
+
+    Raises:
+        TokenStoreUnavailable: Redis is configured but could not be reached.
     """
-    token = f"hca-{uuid.uuid4().hex}"
-    now = datetime.datetime.utcnow()
-    _store[token] = {
-        "user_id":    user_id,
-        "session_id": session_id,
-        "email":      email,
-        "issued_at":  now.isoformat() + "Z",
-        "expires_at": (now + datetime.timedelta(hours=TOKEN_TTL_HOURS)).isoformat() + "Z",
-    }
-    print(f"[TokenStore] Token issued for user {user_id} (session {session_id}).")
+    token, payload = _new_token(user_id, session_id, email)
+    key = _key(token)
+    r = _redis()
+    if r is not None:
+        try:
+            r.set(_REDIS_PREFIX + key, json.dumps(payload), ex=TOKEN_TTL_SECONDS)
+        except redis.RedisError as exc:
+            logger.warning("Token store unavailable, token not issued: %s", exc)
+            raise TokenStoreUnavailable(str(exc)) from exc
+    else:
+        _store_local(key, payload)
+    logger.debug("Token issued for user %s (session %s)", user_id, session_id)
     return token
 
 
@@ -50,19 +178,18 @@ def validate_token(token: Optional[str]) -> Optional[dict]:
     if not token:
         return None
 
-    payload = _store.get(token)
-    if not payload:
-        return None
+    key = _key(token)
+    r = _redis()
+    if r is None:
+        return _validate_local(key)
 
-    # Check expiry
-    expires_at = datetime.datetime.fromisoformat(payload["expires_at"].rstrip("Z"))
-    if datetime.datetime.utcnow() > expires_at:
-        # Prune expired token
-        _store.pop(token, None)
-        print(f"[TokenStore] Token expired and removed.")
+    # Redis drops the key once its TTL passes; no expiry check needed
+    try:
+        raw = r.get(_REDIS_PREFIX + key)
+    except redis.RedisError as exc:
+        logger.warning("Token store unavailable, rejecting token: %s", exc)
         return None
-
-    return payload
+    return json.loads(raw) if raw else None
 
 
 def revoke_token(token: Optional[str]) -> bool:
@@ -72,14 +199,82 @@ def revoke_token(token: Optional[str]) -> bool:
     Returns:
         True if the token existed and was removed, False otherwise.
     """
-    if token and token in _store:
-        user_id = _store[token].get("user_id", "?")
-        _store.pop(token)
-        print(f"[TokenStore] Token revoked for user {user_id}.")
-        return True
-    return False
+    if not token:
+        return False
+
+    key = _key(token)
+    r = _redis()
+    if r is None:
+        return _revoke_local(key)
+
+    try:
+        return bool(r.delete(_REDIS_PREFIX + key))
+    except redis.RedisError as exc:
+        logger.warning("Token store unavailable, token not revoked: %s", exc)
+        return False
+
+
+# ── Async API (FastAPI handlers) ──────────────────────────────────────────────
+
+async def aissue_token(user_id: str, session_id: str, email: str) -> str:
+    """Async issue_token: awaits Redis instead of blocking the event loop."""
+    r = _aredis()
+    if r is None:
+        return issue_token(user_id, session_id, email)
+
+    token, payload = _new_token(user_id, session_id, email)
+    try:
+        await r.set(_REDIS_PREFIX + _key(token), json.dumps(payload), ex=TOKEN_TTL_SECONDS)
+    except redis.RedisError as exc:
+        logger.warning("Token store unavailable, token not issued: %s", exc)
+        raise TokenStoreUnavailable(str(exc)) from exc
+    logger.debug("Token issued for user %s (session %s)", user_id, session_id)
+    return token
+
+
+async def avalidate_token(token: Optional[str]) -> Optional[dict]:
+    """Async validate_token; fails closed (None) when Redis is unreachable."""
+    r = _aredis()
+    if r is None or not token:
+        return validate_token(token)
+
+    try:
+        raw = await r.get(_REDIS_PREFIX + _key(token))
+    except redis.RedisError as exc:
+        logger.warning("Token store unavailable, rejecting token: %s", exc)
+        return None
+    return json.loads(raw) if raw else None
+
+
+async def arevoke_token(token: Optional[str]) -> bool:
+    """Async revoke_token; returns False when Redis is unreachable."""
+    r = _aredis()
+    if r is None or not token:
+        return revoke_token(token)
+
+    try:
+        return bool(await r.delete(_REDIS_PREFIX + _key(token)))
+    except redis.RedisError as exc:
+        logger.warning("Token store unavailable, token not revoked: %s", exc)
+        return False
+
+
+def to_iso(ts: float) -> str:
+    """Render a payload timestamp as an ISO-8601 UTC string (``...Z``)."""
+    return (
+        datetime.datetime.fromtimestamp(ts, datetime.timezone.utc)
+        .isoformat()
+        .replace("+00:00", "Z")
+    )
 
 
 def token_count() -> int:
     """Return the number of active tokens (useful for testing/debugging)."""
+    r = _redis()
+    if r is not None:
+        try:
+            return sum(1 for _ in r.scan_iter(match=_REDIS_PREFIX + "*"))
+        except redis.RedisError as exc:
+            logger.warning("Token store unavailable: %s", exc)
+            return 0
     return len(_store)
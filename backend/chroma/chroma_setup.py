@@ -2,6 +2,7 @@
 ChromaDB setup: initialize collections, embed and store disease guidelines
 and hospital summaries from JSON knowledge files for semantic retrieval.
 """
+import functools
 import json
 import os
 import sys
@@ -20,14 +21,21 @@ DISEASE_FILE = os.path.join(KNOWLEDGE_DIR, "disease_guidelines.json")
 HOSPITAL_FILE = os.path.join(KNOWLEDGE_DIR, "hospital_data.json")
 
 
+@functools.lru_cache(maxsize=1)
 def get_chroma_client() -> chromadb.PersistentClient:
-    """Return a persistent ChromaDB client."""
+    """Return the process-wide persistent ChromaDB client (opened once)."""
     os.makedirs(CHROMA_PERSIST_DIR, exist_ok=True)
     return chromadb.PersistentClient(path=CHROMA_PERSIST_DIR)
 
 
+@functools.lru_cache(maxsize=1)
 def get_embedding_function():
-    """Use sentence-transformers for embeddings (no external API key needed)."""
+    """
+    Use sentence-transformers for embeddings (no external API key needed).
+
+    The model is loaded on the first call and shared by every seeder and
+    query afterwards, instead of being reloaded from disk each time.
+    """
     return embedding_functions.SentenceTransformerEmbeddingFunction(
         model_name="all-MiniLM-L6-v2"
     )
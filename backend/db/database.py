@@ -1,16 +1,42 @@
 """
 SQLAlchemy async engine, session factory, and Base declarative model.
 """
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+import asyncio
+import logging
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
-from backend.config import DATABASE_URL
+from backend.config import DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_PGBOUNCER
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
 
 
 class Base(DeclarativeBase):
     pass
 
 
-engine = create_async_engine(DATABASE_URL, echo=False, future=True)
+def build_engine(url: str = DATABASE_URL) -> AsyncEngine:
+    """
+    Create the pooled asyncpg engine.
+
+    Connections are kept in a QueuePool sized by DB_POOL_SIZE / DB_MAX_OVERFLOW
+    and pinged on checkout so stale connections are replaced transparently.
+    Behind PgBouncer (DB_PGBOUNCER) asyncpg's statement cache is turned off,
+    since prepared statements do not survive PgBouncer's connection swaps.
+    """
+    return create_async_engine(
+        url,
+        echo=False,
+        future=True,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        connect_args={"statement_cache_size": 0} if DB_PGBOUNCER else {},
+    )
+
+
+engine = build_engine()
 
 AsyncSessionLocal = async_sessionmaker(
     bind=engine,
@@ -25,8 +51,18 @@ async def get_db():
         yield session
 
 
+async def warmup_pool(size: int = DB_POOL_SIZE) -> None:
+    """Open ``size`` pooled connections concurrently so first requests skip the connect cost."""
+    async def _touch():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(_touch() for _ in range(size)))
+    logger.info("Connection pool warmed (%d connections)", size)
+
+
 async def init_db():
     """Create all tables on startup."""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
-    print("[DB] All tables created successfully.")
+    logger.info("All tables created successfully")
@@ -0,0 +1,28 @@
+-- user_sessions.start_time / end_time → TIMESTAMP WITH TIME ZONE
+--
+-- Only needed for databases created before both columns became timezone-aware;
+-- fresh databases get the new types from init_db(). Existing naive values were
+-- written as UTC, so they are reinterpreted AT TIME ZONE 'UTC'. Columns that
+-- are already timestamptz are skipped, so the script is safe to re-run.
+--
+--   psql "$DATABASE_URL" -f backend/db/migrations/001_user_sessions_timestamptz.sql
+--   (use a plain postgresql:// URL; psql does not understand +asyncpg)
+
+DO $$
+DECLARE
+    col text;
+BEGIN
+    FOREACH col IN ARRAY ARRAY['start_time', 'end_time'] LOOP
+        IF EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'user_sessions'
+              AND column_name = col
+              AND data_type = 'timestamp without time zone'
+        ) THEN
+            EXECUTE format(
+                'ALTER TABLE user_sessions ALTER COLUMN %I TYPE timestamptz USING %I AT TIME ZONE ''UTC''',
+                col, col
+            );
+        END IF;
+    END LOOP;
+END $$;
@@ -0,0 +1,13 @@
+-- medical_profiles (user_id, created_at) index for per-user profile listings
+--
+-- Only needed for databases created before the index was added to the model;
+-- fresh databases get it from init_db(). CONCURRENTLY builds the index without
+-- blocking writes to medical_profiles, and IF NOT EXISTS makes the script safe
+-- to re-run. CREATE INDEX CONCURRENTLY cannot run inside a transaction block,
+-- so run this file on its own (not with psql --single-transaction).
+--
+--   psql "$DATABASE_URL" -f backend/db/migrations/002_medical_profiles_user_id_created.sql
+--   (use a plain postgresql:// URL; psql does not understand +asyncpg)
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_medical_profiles_user_id_created
+    ON medical_profiles (user_id, created_at);
@@ -3,10 +3,10 @@ SQLAlchemy ORM models matching the ER Diagram exactly.
 All tables and relationships defined here.
 """
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 from sqlalchemy import (
     Column, String, Integer, Float, Boolean, Text, DateTime,
-    ForeignKey, JSON
+    ForeignKey, JSON, Index
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -43,8 +43,10 @@ class UserSession(Base):
 
     session_id = Column(UUID(as_uuid=False), primary_key=True, default=generate_uuid)
     user_id = Column(UUID(as_uuid=False), ForeignKey("users.user_id"), nullable=False)
-    start_time = Column(DateTime, default=datetime.utcnow)
-    end_time = Column(DateTime, nullable=True)
+    # Both timezone-aware so session durations can be computed directly
+    # (older databases: backend/db/migrations/001_user_sessions_timestamptz.sql)
+    start_time = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    end_time = Column(DateTime(timezone=True), nullable=True)
     goal = Column(Text, nullable=True)
     status = Column(String(50), default="active")  # active, completed, error
 
@@ -71,6 +73,11 @@ class MedicalProfile(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Serves per-user profile listings (see MedicalDataService.fetch_user_profiles)
+    __table_args__ = (
+        Index("ix_medical_profiles_user_id_created", "user_id", "created_at"),
+    )
+
     # Relationships
     user = relationship("User", back_populates="medical_profiles")
     lab_reports = relationship("LabReport", back_populates="medical_profile", cascade="all, delete-orphan")
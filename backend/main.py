@@ -7,6 +7,9 @@ Lifecycle:
 """
 import sys
 import os
+import logging
+import logging.handlers
+import queue
 
 # Ensure the project root is in the Python path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -14,21 +17,44 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from backend.db.database import init_db
+from fastapi.responses import ORJSONResponse
+from backend.db.database import init_db, warmup_pool
 from backend.api.routes import router
 from backend.api.auth_routes import router as auth_router
-from backend.config import FASTAPI_HOST, FASTAPI_PORT
+from backend.config import FASTAPI_HOST, FASTAPI_PORT, LOG_LEVEL
+
+
+def _start_logging() -> tuple[logging.Handler, logging.handlers.QueueListener]:
+    """
+    Attach a QueueHandler to the ``backend`` logger and start its listener.
+
+    Request handlers only enqueue records; formatting and the stderr write
+    happen on the listener's thread, off the event loop.
+    """
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    stream = logging.StreamHandler()
+    stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+    listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+
+    handler = logging.handlers.QueueHandler(log_queue)
+    backend_logger = logging.getLogger("backend")
+    backend_logger.setLevel(LOG_LEVEL)
+    backend_logger.addHandler(handler)
+    listener.start()
+    return handler, listener
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown lifecycle manager."""
+    log_handler, log_listener = _start_logging()
     print("[App] Starting Healthcare Planning Assistant Agent...")
 
     # 1. Initialise PostgreSQL tables (Required for Auth)
     try:
         await init_db()
         print("[App] PostgreSQL tables ready.")
+        await warmup_pool()
     except Exception as e:
         print(f"[App] WARNING: PostgreSQL init failed: {e}")
 
@@ -49,7 +75,8 @@ async def lifespan(app: FastAPI):
 
     print("[App] Shutting down Healthcare Planning Assistant Agent.")
 
-    print("[App] Shutting down Healthcare Planning Assistant Agent.")
+    logging.getLogger("backend").removeHandler(log_handler)
+    log_listener.stop()
 
 
 # ── FastAPI Application ───────────────────────────────────────────────────────
@@ -61,6 +88,8 @@ app = FastAPI(
     ),
     version="1.0.0",
     lifespan=lifespan,
+    # orjson for every JSON response; plan results are large nested dicts
+    default_response_class=ORJSONResponse,
 )
 
 # ── CORS ─────────────────────────────────────────────────────────────────────
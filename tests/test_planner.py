@@ -83,6 +83,23 @@ class TestQuestionService:
         assert "unknown_field" not in collected
         assert collected.get("disease_type") == "Diabetes"
 
+    def test_collect_responses_keeps_question_order(self):
+        """Collected answers follow question order, not answer or hash order."""
+        from backend.agents.question_service import QuestionService, DEFAULT_QUESTIONS
+        answers = {q["field"]: "x" for q in reversed(DEFAULT_QUESTIONS)}
+        collected = QuestionService().collect_responses(DEFAULT_QUESTIONS, answers)
+        assert list(collected) == [q["field"] for q in DEFAULT_QUESTIONS]
+
+    def test_unparseable_reply_is_not_cached(self):
+        """A reply without a question array must raise so cached_generate skips it."""
+        from backend.agents.question_service import _parse_questions
+        raw = 'Sure! [{"field": "age", "question": "Age?", "required": true}]'
+        assert _parse_questions(raw)[0]["field"] == "age"
+        with pytest.raises(ValueError):
+            _parse_questions("I cannot help with that.")
+        with pytest.raises(ValueError):
+            _parse_questions("[]")
+
 
 class TestValidationEngine:
     def test_complete_profile_passes(self):
@@ -153,6 +170,48 @@ class TestDecisionEngine:
         decision = de.analyze(profile, constraint)
         assert decision["hospital_type"] == "Endocrinology"
 
+    def test_exact_stage_match_preferred(self):
+        """'Stage II' must resolve to Stage II, not the 'Stage I' substring match."""
+        from backend.agents.decision_engine import DecisionEngine
+        de = DecisionEngine()
+        guideline = de._find_disease_guideline("Breast Cancer", "Stage II")
+        assert guideline["stage_info"]["stage"] == "Stage II"
+
+    def test_fingerprint_ignores_non_decision_fields(self):
+        """Profiles differing only in symptoms share a pipeline cache entry."""
+        from backend.agents.decision_engine import _fingerprint
+        constraint = {"budget_limit": 300000, "hospital_preference": "private"}
+        a = {"disease_type": "Diabetes", "stage": "Type 2", "symptoms": "Thirst"}
+        b = {"disease_type": "Diabetes", "stage": "Type 2", "symptoms": "Fatigue"}
+        assert _fingerprint(a, constraint) == _fingerprint(b, constraint)
+        assert _fingerprint(a, constraint) != _fingerprint(a, {**constraint, "budget_limit": 50000})
+
+    def test_needs_llm_only_for_complex_profiles(self):
+        """Routine guideline cases skip Gemini; non-trivial history does not."""
+        from backend.agents.decision_engine import DecisionEngine
+        de = DecisionEngine()
+        guideline = de._find_disease_guideline("Breast Cancer", "Stage II")
+        routine = {"stage": "Stage II", "surgery_allowed": True, "medical_history": "None"}
+        assert not de._needs_llm(routine, guideline)
+        assert de._needs_llm({**routine, "medical_history": "Hypertension"}, guideline)
+        assert de._needs_llm(routine, None)
+
+    def test_templated_decision_reports_json_source(self, monkeypatch):
+        """Decisions that skip ChromaDB must not claim it as a source."""
+        from backend.agents import decision_engine as de_mod
+        monkeypatch.setattr(de_mod, "LLM_BYPASS_ENABLED", True)
+        profile = {"disease_type": "Breast Cancer", "stage": "Stage II",
+                   "surgery_allowed": True, "medical_history": "None"}
+        decision = de_mod.DecisionEngine().analyze(profile, {"hospital_preference": "private"})
+        assert decision["guideline_source"] == "JSON"
+
+    def test_surgery_pattern_matches_inflections(self):
+        """Compound and plural surgical terms must still be filtered."""
+        from backend.agents.decision_engine import _SURGERY_RE
+        for treatment in ("Neurosurgery", "Two surgeries", "Microsurgical repair"):
+            assert _SURGERY_RE.search(treatment)
+        assert not _SURGERY_RE.search("Chemotherapy")
+
     def test_no_surgery_filters_surgical_treatments(self):
         """Surgery-related treatments must be excluded when surgery_allowed=False."""
         from backend.agents.decision_engine import DecisionEngine
@@ -172,6 +231,73 @@ class TestDecisionEngine:
         assert "mastectomy" not in treatment
         assert "lumpectomy" not in treatment
 
+    def test_cache_hits_do_not_share_nested_state(self):
+        """Editing a returned decision must not corrupt the cached entry."""
+        from backend.agents import decision_engine as de_mod
+        profile = {"disease_type": "Diabetes", "stage": "Type 2"}
+        constraint = {"budget_limit": 100000, "hospital_preference": "government"}
+        key = de_mod._fingerprint(profile, constraint)
+        de_mod._PIPELINE_CACHE[key] = {
+            "notes": "", "required_reports": ["HbA1c"],
+            "suggested_hospitals": [{"hospital_id": "H001", "name": "A"}],
+        }
+        try:
+            engine = de_mod.DecisionEngine()
+            first = engine.analyze(profile, constraint)
+            first["required_reports"].append("MRI")
+            first["suggested_hospitals"][0]["name"] = "changed"
+            second = engine.analyze(profile, constraint)
+            assert second["required_reports"] == ["HbA1c"]
+            assert second["suggested_hospitals"][0]["name"] == "A"
+        finally:
+            de_mod._PIPELINE_CACHE.pop(key, None)
+
+    def test_invalidate_picks_up_catalogue_edits(self, tmp_path, monkeypatch):
+        """After invalidate(), the shared engine must serve the edited catalogue."""
+        import json
+        from backend.agents import decision_engine as de_mod
+        from backend.agents._registry import get_decision_engine
+        catalogue = tmp_path / "hospital_data.json"
+        with open(de_mod.HOSPITAL_FILE) as f:
+            data = json.load(f)
+        catalogue.write_text(json.dumps(data))
+        monkeypatch.setattr(de_mod, "HOSPITAL_FILE", str(catalogue))
+        profile = {"disease_type": "Breast Cancer", "stage": "Stage II", "surgery_allowed": True}
+        constraint = {"budget_limit": 500000, "hospital_preference": "private"}
+        try:
+            de_mod.invalidate()
+            top = get_decision_engine().analyze(profile, constraint)["suggested_hospitals"][0]
+            for h in data["hospitals"]:
+                if h["hospital_id"] == top["hospital_id"]:
+                    h["name"] = "Renamed Cancer Centre"
+            catalogue.write_text(json.dumps(data))
+            de_mod.invalidate()
+            top = get_decision_engine().analyze(profile, constraint)["suggested_hospitals"][0]
+            assert top["name"] == "Renamed Cancer Centre"
+        finally:
+            monkeypatch.undo()
+            de_mod.invalidate()
+
+    def test_indexes_follow_knowledge_file_mtime(self, tmp_path, monkeypatch):
+        """An edited catalogue (new mtime) must rebuild the engine's indexes."""
+        import json
+        from backend.agents import decision_engine as de_mod
+        catalogue = tmp_path / "hospital_data.json"
+        with open(de_mod.HOSPITAL_FILE) as f:
+            data = json.load(f)
+        catalogue.write_text(json.dumps(data))
+        monkeypatch.setattr(de_mod, "HOSPITAL_FILE", str(catalogue))
+        engine = de_mod.DecisionEngine()
+        constraint = {"hospital_preference": "private"}
+        top = engine._filter_hospitals("Oncology", constraint)[0]
+        for h in data["hospitals"]:
+            if h["hospital_id"] == top["hospital_id"]:
+                h["name"] = "Renamed Cancer Centre"
+        catalogue.write_text(json.dumps(data))
+        stat = os.stat(catalogue)
+        os.utime(catalogue, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert engine._filter_hospitals("Oncology", constraint)[0]["name"] == "Renamed Cancer Centre"
+
 
 class TestRecommendationEngine:
     def test_generate_plan_structure(self):
@@ -211,6 +337,17 @@ class TestRecommendationEngine:
         assert len(result["ranked_hospitals"]) == 1
         assert result["ranked_hospitals"][0]["priority_rank"] == "1"
 
+    def test_no_private_keys_leak_into_output(self):
+        """Catalogue hospitals and ranked output must not carry internal _keys."""
+        from backend.agents.decision_engine import DecisionEngine
+        from backend.agents.recommendation_engine import RecommendationEngine
+        profile = {"disease_type": "Breast Cancer", "stage": "Stage II", "surgery_allowed": True}
+        constraint = {"budget_limit": 500000, "hospital_preference": "private"}
+        decision = DecisionEngine().analyze(profile, constraint)
+        ranked = RecommendationEngine().generate_plan(decision)["ranked_hospitals"]
+        for h in decision["suggested_hospitals"] + ranked:
+            assert not [k for k in h if k.startswith("_")]
+
     def test_hospital_ranking_order(self):
         """Hospitals should be sorted correctly by composite score."""
         from backend.agents.recommendation_engine import RecommendationEngine
@@ -231,6 +368,141 @@ class TestRecommendationEngine:
         assert ranked[0]["priority_rank"] == "1"
 
 
+class TestLLMCache:
+    def test_identical_prompts_hit_cache(self):
+        """cached_generate should only call the model once per canonical key."""
+        from backend.agents._llm import make_cache_key, cached_generate, clear_cache
+
+        class _FakeResponse:
+            text = "  cached reasoning  "
+
+        class _FakeModel:
+            calls = 0
+
+            def generate_content(self, prompt):
+                self.calls += 1
+                return _FakeResponse()
+
+        clear_cache()
+        model = _FakeModel()
+        key_a = make_cache_key("reasoning", "Breast Cancer", "Stage II")
+        key_b = make_cache_key("reasoning", "  breast   cancer ", "STAGE II")
+        assert key_a == key_b
+        assert cached_generate(model, "prompt", key_a) == "cached reasoning"
+        assert cached_generate(model, "prompt", key_b) == "cached reasoning"
+        assert model.calls == 1
+        clear_cache()
+
+
+class TestMedicalDataService:
+    def test_cached_user_skips_db(self):
+        """A recently seen email must be served without touching the session."""
+        import asyncio
+        from backend.agents import medical_data_service as mds
+        from backend.db.models import User
+
+        user = User(user_id="u-1", name="Asha", email="asha@example.com",
+                    location="Pune", budget=None, created_at=None)
+        mds._remember_user(user)
+        try:
+            cached = asyncio.run(mds.MedicalDataService().get_or_create_user(
+                db=None, name="Asha", email="asha@example.com"))
+            assert cached.user_id == "u-1"
+        finally:
+            mds.invalidate_user("asha@example.com")
+
+    def test_rolled_back_user_is_not_cached(self):
+        """A user whose transaction rolled back must not be served from cache."""
+        import asyncio
+        import contextlib
+        from backend.agents import medical_data_service as mds
+        from backend.db.models import User
+
+        class _FailingSessionInsert:
+            calls = 0
+
+            @contextlib.asynccontextmanager
+            async def begin(self):
+                yield
+
+            async def scalar(self, stmt, **kwargs):
+                self.calls += 1
+                if self.calls == 1:
+                    return User(user_id="u-9", name="Ravi", email="ravi@example.com",
+                                location="", budget=None, created_at=None)
+                raise RuntimeError("session insert failed")
+
+        mds.invalidate_user("ravi@example.com")
+        with pytest.raises(RuntimeError):
+            asyncio.run(mds.MedicalDataService().start_session(
+                _FailingSessionInsert(), name="Ravi", email="ravi@example.com"))
+        assert mds._cached_user("ravi@example.com") is None
+
+    def test_mapping_is_memoised(self):
+        """Identical responses map once and come back read-only."""
+        from backend.agents.medical_data_service import MedicalDataService
+        svc = MedicalDataService()
+        responses = {"disease_type": "Diabetes", "age": "52", "budget_limit": "2,00,000 INR"}
+        first = svc.map_responses_to_profile("u-1", responses)
+        assert svc.map_responses_to_profile("u-1", dict(responses)) is first
+        assert first.profile["age"] == 52
+        assert first.constraint["budget_limit"] == 200000.0
+        with pytest.raises(TypeError):
+            first.profile["age"] = 60
+
+
+class TestTokenStore:
+    def test_expired_tokens_are_swept(self):
+        """Expired tokens must be evicted even if nobody validates them again."""
+        import heapq
+        from backend.auth import token_store as ts
+        stale = ts._key(ts.issue_token("u-1", "s-1", "a@example.com"))
+        ts._store[stale]["expires_at"] = 0.0
+        ts._expiry_heap[:] = [(0.0 if k == stale else exp, k) for exp, k in ts._expiry_heap]
+        heapq.heapify(ts._expiry_heap)
+        fresh = ts.issue_token("u-2", "s-2", "b@example.com")
+        try:
+            assert stale not in ts._store
+            assert ts.validate_token(fresh)["user_id"] == "u-2"
+        finally:
+            ts.revoke_token(fresh)
+
+    def test_raw_token_is_not_stored(self):
+        """Only the token's hash may be used as the storage key."""
+        from backend.auth import token_store as ts
+        token = ts.issue_token("u-3", "s-3", "c@example.com")
+        try:
+            assert token not in ts._store
+            assert ts._key(token) in ts._store
+        finally:
+            assert ts.revoke_token(token) is True
+        assert ts.validate_token(token) is None
+
+    def test_redis_outage_fails_closed(self, monkeypatch):
+        """A Redis error must reject the token rather than surface as a 500."""
+        import asyncio
+        redis = pytest.importorskip("redis")
+        from backend.auth import token_store as ts
+
+        class _DownRedis:
+            def get(self, key):
+                raise redis.ConnectionError("down")
+            set = delete = get
+
+        class _DownAsyncRedis:
+            async def get(self, *args, **kwargs):
+                raise redis.ConnectionError("down")
+            set = delete = get
+
+        monkeypatch.setattr(ts, "_redis", lambda: _DownRedis())
+        monkeypatch.setattr(ts, "_aredis", lambda: _DownAsyncRedis())
+        assert ts.validate_token("hca-abc") is None
+        assert asyncio.run(ts.avalidate_token("hca-abc")) is None
+        assert asyncio.run(ts.arevoke_token("hca-abc")) is False
+        with pytest.raises(ts.TokenStoreUnavailable):
+            asyncio.run(ts.aissue_token("u-4", "s-4", "d@example.com"))
+
+
 class TestPlannerAgent:
     def test_goal_decomposition(self):
         """PlannerAgent must decompose goal into 11 subtasks."""
@@ -315,6 +587,77 @@ class TestPlannerAgent:
         planner.createExecutionPlan()
         assert planner.state["status"] == "plan_created"
 
+    def test_audit_trail_flushes_buffered_entries(self):
+        """Buffered _log entries must all surface, in order, via get_audit_trail."""
+        from backend.agents.planner_agent import PlannerAgent
+        planner = PlannerAgent()
+        planner.receiveGoal("Diabetes management")
+        planner.decomposeGoal()
+        trail = planner.get_audit_trail()
+        assert [e["step"] for e in trail] == ["Goal received", "Goal decomposed"]
+        assert trail[0]["timestamp"].endswith("Z")
+
+    def test_audit_trail_is_bounded(self):
+        """The in-memory audit trail keeps only the newest AUDIT_TRAIL_MAXLEN entries."""
+        from backend.agents.planner_agent import PlannerAgent, AUDIT_TRAIL_MAXLEN
+        planner = PlannerAgent()
+        for i in range(AUDIT_TRAIL_MAXLEN + 10):
+            planner._log("step", detail=str(i))
+        trail = planner.get_audit_trail()
+        assert len(trail) == AUDIT_TRAIL_MAXLEN
+        assert trail[-1]["detail"] == str(AUDIT_TRAIL_MAXLEN + 9)
+
+    def test_unchanged_responses_are_not_revalidated(self):
+        """Resubmitting identical answers must reuse the previous validation."""
+        from backend.agents.planner_agent import PlannerAgent
+        planner = PlannerAgent()
+        answers = {"disease_type": "Cancer", "stage": "Stage II"}
+        first = planner._run_validation(answers)
+        assert planner._run_validation(dict(answers)) is first
+        assert planner._run_validation({**answers, "age": 40}) is not first
+        # Earlier answer sets stay cached after a newer one is validated
+        assert planner._run_validation(answers) is first
+
+    def test_response_key_ignores_answer_order(self):
+        """Identical answers in any order must share one response-cache entry."""
+        from backend.agents.planner_agent import _response_key
+        a = {"disease_type": "Cancer", "stage": "Stage II"}
+        b = {"stage": "Stage II", "disease_type": "Cancer"}
+        assert _response_key("goal", a) == _response_key("goal", b)
+        assert _response_key("goal", a) != _response_key("other goal", a)
+
+    def test_degraded_plan_is_not_cached(self, monkeypatch):
+        """A Gemini outage must not pin its fallback plan for the next submission."""
+        from backend.agents import decision_engine as de
+        from backend.agents.planner_agent import PlannerAgent, _RESPONSE_CACHE
+        calls = []
+
+        def _gemini_down():
+            calls.append(1)
+            raise RuntimeError("Gemini unavailable")
+
+        monkeypatch.setattr(de, "LLM_BYPASS_ENABLED", False)
+        monkeypatch.setattr(de, "get_model", _gemini_down)
+        de.invalidate()
+        for _ in range(2):
+            planner = PlannerAgent()
+            planner.receiveGoal("I want treatment options for breast cancer")
+            result = planner.execute_plan_stepwise(dict(SAMPLE_BREAST_CANCER))
+            assert planner.state.decision["degraded"] is True
+            assert "treatment_plan" in result
+        assert len(calls) == 2
+        assert len(_RESPONSE_CACHE) == 0
+
+    def test_state_supports_attribute_and_key_access(self):
+        """PlannerState must stay readable as a mapping for routes and the UI."""
+        from backend.agents.planner_agent import PlannerAgent
+        planner = PlannerAgent()
+        planner.receiveGoal("Cancer treatment plan")
+        assert planner.state.status == planner.state["status"] == "goal_received"
+        assert planner.state.get("unknown", "fallback") == "fallback"
+        with pytest.raises(KeyError):
+            planner.state["unknown"] = 1
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v", "--tb=short"])